@@ -0,0 +1,75 @@
+"""
+Microbenchmark for the geo feature kernel.
+
+Reports ns/row for the fused kernel (float64 and float32) against the three
+reference functions it replaces, at 1, 1k and 10M rows. Single rows are also
+timed through the scalar form the API uses.
+
+Usage:
+    python benchmarks/bench_geo.py [--sizes 1 1000 10000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.geo import (
+    bearing_array, dummy_manhattan_distance, geo_features, geo_features_scalar, haversine_array
+)
+
+
+def nyc_coords(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.uniform(40.60, 40.90, n), rng.uniform(-74.05, -73.75, n),
+            rng.uniform(40.60, 40.90, n), rng.uniform(-74.05, -73.75, n))
+
+
+def separate(lat1, lng1, lat2, lng2):
+    return (haversine_array(lat1, lng1, lat2, lng2),
+            dummy_manhattan_distance(lat1, lng1, lat2, lng2),
+            bearing_array(lat1, lng1, lat2, lng2))
+
+
+def time_per_row(fn, n, min_seconds=0.5):
+    """Best-of-repeats wall time per row in nanoseconds"""
+    fn()
+    best = float('inf')
+    deadline = time.perf_counter() + min_seconds
+    runs = 0
+    while runs < 3 or time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+        runs += 1
+    return best / n * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 10_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'separate':>12} {'fused f64':>12} {'fused f32':>12} {'scalar':>12}  (ns/row)")
+    for n in args.sizes:
+        coords = nyc_coords(n)
+        coords32 = tuple(c.astype(np.float32) for c in coords)
+        out64 = np.empty((3, n))
+        out32 = np.empty((3, n), dtype=np.float32)
+        results = [
+            time_per_row(lambda: separate(*coords), n),
+            time_per_row(lambda: geo_features(*coords, out=out64), n),
+            time_per_row(lambda: geo_features(*coords32, out=out32, dtype=np.float32), n),
+        ]
+        if n == 1:
+            trip = tuple(float(c[0]) for c in coords)
+            results.append(time_per_row(lambda: geo_features_scalar(*trip), n))
+        print(f"{n:>10} " + " ".join(f"{r:>12.1f}" for r in results))
+
+
+if __name__ == '__main__':
+    main()
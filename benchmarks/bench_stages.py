@@ -0,0 +1,236 @@
+"""
+Microbenchmarks for the feature and inference stages, with a regression gate.
+
+Times each stage on synthetic NYC trips at several sizes (best of repeated
+runs) and records its peak traced memory in a separate run, so tracemalloc
+overhead never shows up in the timings. Results can be saved as a baseline;
+later runs are compared against it and the script exits non-zero when any
+stage is slower, or allocates more, than the baseline by more than the
+given threshold, or when there is no baseline at all (unless
+--allow-missing-baseline). Timings are machine-specific, so the baseline
+is not committed: save one on the machine that runs the gate.
+
+Stages:
+    geo_features          fused distance kernel on coordinate arrays
+    feature_build         training feature pipeline on a raw DataFrame
+    preprocess_input      API single-trip DataFrame path (1 row only)
+    preprocess_batch      API vectorized batch path
+    build_feature_matrix  API row-wise path (up to 10k rows)
+    model_predict         RandomForestRegressor.predict, n_jobs=1
+    compiled_predict      the same forest as a CompiledForest
+
+Usage:
+    python benchmarks/bench_stages.py --save-baseline
+    python benchmarks/bench_stages.py --threshold 0.2 --sizes 1 100 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import yaml
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src', 'features'))
+
+from feature_definitions import create_datetime_features, create_dist_features, datetime_feature_fix
+from src.features.geo import geo_features
+from src.models.compiled_forest import CompiledForest
+from src.service import REQUIRED_FEATURES, build_feature_matrix, parse_trip, preprocess_batch, preprocess_input
+
+# Row-wise stages cost microseconds per row in Python; past this size they
+# only make the suite slow without saying anything new.
+ROW_WISE_MAX_ROWS = 10_000
+
+
+def synthetic_raw(n, seed=0):
+    """Raw trips shaped like data/raw/train.csv, inside the NYC bounding box"""
+    rng = np.random.default_rng(seed)
+    pickup = pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 182 * 86400, n), unit='s')
+    duration = rng.integers(60, 3600, n)
+    return pd.DataFrame({
+        'id': [f'id{i:07d}' for i in range(n)],
+        'vendor_id': rng.integers(1, 3, n),
+        'pickup_datetime': pickup.strftime('%Y-%m-%d %H:%M:%S'),
+        'dropoff_datetime': (pickup + pd.to_timedelta(duration, unit='s')).strftime('%Y-%m-%d %H:%M:%S'),
+        'passenger_count': rng.integers(1, 7, n),
+        'pickup_longitude': rng.uniform(-74.05, -73.75, n),
+        'pickup_latitude': rng.uniform(40.60, 40.90, n),
+        'dropoff_longitude': rng.uniform(-74.05, -73.75, n),
+        'dropoff_latitude': rng.uniform(40.60, 40.90, n),
+        'store_and_fwd_flag': np.where(rng.random(n) < 0.01, 'Y', 'N'),
+        'trip_duration': duration,
+    })
+
+
+def api_trips(raw):
+    columns = ['vendor_id', 'passenger_count', 'pickup_datetime', 'pickup_longitude',
+               'pickup_latitude', 'dropoff_longitude', 'dropoff_latitude']
+    return [parse_trip(trip) for trip in raw[columns].to_dict('records')]
+
+
+def feature_build(df):
+    # feature_definitions.feature_build prints the frame; time the same steps without it.
+    datetime_feature_fix(df)
+    create_dist_features(df)
+    create_datetime_features(df)
+    return df
+
+
+def synthetic_model(seed=0):
+    """A forest with the production hyperparameters, fitted on synthetic trips"""
+    from sklearn.ensemble import RandomForestRegressor
+
+    with open(os.path.join(ROOT, 'params.yaml')) as f:
+        params = yaml.safe_load(f)['train_model']
+    raw = feature_build(synthetic_raw(20_000, seed))
+    model = RandomForestRegressor(n_estimators=params['n_estimators'], max_depth=params['max_depth'],
+                                  random_state=params['seed'], n_jobs=-1)
+    model.fit(raw[REQUIRED_FEATURES].values, raw['trip_duration'].values)
+    model.n_jobs = 1
+    return model
+
+
+def stage_cases(n, model, forest):
+    """(stage, setup, fn) for every stage that runs at ``n`` rows.
+
+    ``setup`` builds fresh inputs outside the timed region; ``fn`` is the
+    timed call on them.
+    """
+    raw = synthetic_raw(n)
+    coords = tuple(raw[c].values for c in
+                   ('pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude'))
+    out = np.empty((3, n))
+    trips = api_trips(raw)
+    X = np.ascontiguousarray(feature_build(raw.copy())[REQUIRED_FEATURES].values, dtype=np.float32)
+
+    cases = [
+        ('geo_features', lambda: coords, lambda c: geo_features(*c, out=out)),
+        ('feature_build', lambda: raw.copy(), feature_build),
+        ('preprocess_batch', lambda: trips, preprocess_batch),
+    ]
+    if n == 1:
+        cases.append(('preprocess_input', lambda: trips[0], preprocess_input))
+    if n <= ROW_WISE_MAX_ROWS:
+        cases.append(('build_feature_matrix', lambda: trips, build_feature_matrix))
+    cases.append(('model_predict', lambda: X, model.predict))
+    cases.append(('compiled_predict', lambda: X, forest.predict))
+    return cases
+
+
+def time_stage(setup, fn, min_seconds):
+    """Best-of-repeats wall time in seconds, at least three runs"""
+    best = float('inf')
+    deadline = time.perf_counter() + min_seconds
+    runs = 0
+    fn(setup())
+    while runs < 3 or time.perf_counter() < deadline:
+        args = setup()
+        started = time.perf_counter()
+        fn(args)
+        best = min(best, time.perf_counter() - started)
+        runs += 1
+    return best
+
+
+def peak_memory(setup, fn):
+    args = setup()
+    tracemalloc.start()
+    try:
+        fn(args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        result['time_change'] = result['seconds'] / previous['seconds'] - 1
+        result['memory_change'] = (result['peak_bytes'] / previous['peak_bytes'] - 1
+                                   if previous['peak_bytes'] else 0.0)
+        if result['time_change'] > threshold:
+            regressions.append(f"{key}: {result['time_change']:+.0%} time")
+        if result['memory_change'] > memory_threshold:
+            regressions.append(f"{key}: {result['memory_change']:+.0%} peak memory")
+    return regressions
+
+
+def check_baseline(results, args):
+    """Exit status of the regression gate: 0 passes, 1 regressed, 2 no baseline"""
+    if not os.path.exists(args.baseline):
+        # A gate with nothing to compare against must not pass silently.
+        print(f"no baseline at {args.baseline}; run with --save-baseline on this machine to create one")
+        return 0 if args.allow_missing_baseline else 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+    if regressions:
+        print("regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"no regressions against {args.baseline}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 10_000, 1_000_000])
+    parser.add_argument('--stages', nargs='+', help='Only run these stages')
+    parser.add_argument('--model', help='Model to benchmark (default: a synthetic forest with params.yaml settings)')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='Timing budget per stage and size')
+    parser.add_argument('--baseline', default=os.path.join(ROOT, 'benchmarks', 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help='Exit 0 instead of failing when there is no baseline to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='Allowed peak memory growth against the baseline, as a fraction')
+    parser.add_argument('--output', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.model:
+        import joblib
+        model = joblib.load(args.model)
+        model.n_jobs = 1
+    else:
+        model = synthetic_model()
+    forest = CompiledForest.from_sklearn(model)
+
+    results = {}
+    print(f"{'stage':<22} {'rows':>8} {'time':>12} {'ns/row':>10} {'peak MB':>9}")
+    for n in args.sizes:
+        for stage, setup, fn in stage_cases(n, model, forest):
+            if args.stages and stage not in args.stages:
+                continue
+            seconds = time_stage(setup, fn, args.min_seconds)
+            peak = peak_memory(setup, fn)
+            results[f'{stage}/{n}'] = {'stage': stage, 'rows': n, 'seconds': seconds, 'peak_bytes': peak}
+            print(f"{stage:<22} {n:>8} {seconds * 1e3:>10.3f}ms {seconds / n * 1e9:>10.0f} {peak / 1e6:>9.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"saved baseline to {args.baseline}")
+        return
+
+    sys.exit(check_baseline(results, args))
+
+
+if __name__ == '__main__':
+    main()
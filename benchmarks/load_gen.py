@@ -0,0 +1,280 @@
+"""
+Load test for the prediction service.
+
+Drives /predict and /predict/batch with a configurable request mix, either
+closed-loop (a fixed number of clients, each sending its next request as
+soon as the last one returns) or open-loop (requests fired on a Poisson
+schedule at a fixed rate, whether or not earlier ones have returned). Open-
+loop latency is measured from the scheduled send time, so a stalled server
+shows up as queueing delay instead of quietly lowering the offered load.
+
+Without --url the service is started on a free local port with uvicorn and
+stopped afterwards. Results (throughput, p50/p95/p99 per endpoint and
+overall) are printed and written as JSON for comparing commits.
+
+Usage:
+    python benchmarks/load_gen.py --mode closed --concurrency 1 8 32 --duration 10
+    python benchmarks/load_gen.py --mode open --rate 200 500 --mix predict=0.9,batch=0.1
+    python benchmarks/load_gen.py --url http://localhost:8000 --output reports/load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENDPOINTS = {'predict': '/predict', 'batch': '/predict/batch'}
+
+
+def synthetic_trips(n, seed=0):
+    """Trips inside the NYC bounding box with pickups spread over 2016"""
+    rng = random.Random(seed)
+    base = datetime(2016, 1, 1)
+    trips = []
+    for _ in range(n):
+        pickup = base + timedelta(seconds=rng.randrange(366 * 24 * 3600))
+        trips.append({
+            'vendor_id': rng.choice([1, 2]),
+            'passenger_count': rng.randint(1, 6),
+            'pickup_datetime': pickup.strftime('%Y-%m-%dT%H:%M:%S'),
+            'pickup_longitude': rng.uniform(-74.05, -73.75),
+            'pickup_latitude': rng.uniform(40.60, 40.90),
+            'dropoff_longitude': rng.uniform(-74.05, -73.75),
+            'dropoff_latitude': rng.uniform(40.60, 40.90),
+        })
+    return trips
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}; choose from {sorted(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    """Picks the next request from the mix, drawing trips from a fixed pool.
+
+    The pool size bounds how many distinct trips are sent, and so how often
+    the service's prediction cache can answer instead of the model.
+    """
+
+    def __init__(self, mix, trips, batch_size, seed=0):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.trips = trips
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+
+    def next_request(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        if name == 'batch':
+            body = self.rng.sample(self.trips, min(self.batch_size, len(self.trips)))
+        else:
+            body = self.rng.choice(self.trips)
+        return name, body
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+
+    async def send(self, client, name, body, started=None):
+        started = time.perf_counter() if started is None else started
+        try:
+            response = await client.post(ENDPOINTS[name], json=body)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            self.latencies[name].append(time.perf_counter() - started)
+        else:
+            self.errors[name] += 1
+
+    def summary(self, elapsed, batch_size):
+        def describe(latencies, errors, trips_per_request):
+            latencies = np.asarray(latencies) * 1000
+            summary = {
+                'requests': int(len(latencies)),
+                'errors': errors,
+                'requests_per_second': len(latencies) / elapsed,
+                'trips_per_second': len(latencies) * trips_per_request / elapsed,
+            }
+            if len(latencies):
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                summary.update(p50_ms=p50, p95_ms=p95, p99_ms=p99,
+                               mean_ms=float(latencies.mean()), max_ms=float(latencies.max()))
+            return summary
+
+        endpoints = {
+            name: describe(self.latencies[name], self.errors[name], batch_size if name == 'batch' else 1)
+            for name in ENDPOINTS if self.latencies[name] or self.errors[name]
+        }
+        overall = describe(sum(self.latencies.values(), []), sum(self.errors.values()), 0)
+        overall['trips_per_second'] = sum(e['trips_per_second'] for e in endpoints.values())
+        return {'elapsed_seconds': elapsed, 'overall': overall, 'endpoints': endpoints}
+
+
+async def closed_loop(client, workload, concurrency, duration):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await recorder.send(client, *workload.next_request())
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return recorder, time.perf_counter() - started
+
+
+async def open_loop(client, workload, rate, duration, seed=0):
+    recorder = Recorder()
+    rng = random.Random(seed)
+    tasks = []
+    started = time.perf_counter()
+    scheduled = started
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - started >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name, body = workload.next_request()
+        tasks.append(asyncio.create_task(recorder.send(client, name, body, started=scheduled)))
+    await asyncio.gather(*tasks)
+    return recorder, time.perf_counter() - started
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60.0):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'src.service:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT,
+    )
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"service exited with code {server.returncode} during start-up")
+        try:
+            if httpx.get(f'{url}/health', timeout=1.0).status_code == 200:
+                return server, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"service did not become healthy within {timeout:.0f}s")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, url):
+    workload = Workload(args.mix, synthetic_trips(args.unique_trips, args.seed), args.batch_size, args.seed)
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    runs = []
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        for _ in range(args.warmup):
+            await Recorder().send(client, *workload.next_request())
+        levels = args.concurrency if args.mode == 'closed' else args.rate
+        for level in levels:
+            if args.mode == 'closed':
+                recorder, elapsed = await closed_loop(client, workload, level, args.duration)
+            else:
+                recorder, elapsed = await open_loop(client, workload, level, args.duration, args.seed)
+            result = recorder.summary(elapsed, args.batch_size)
+            result['concurrency' if args.mode == 'closed' else 'offered_rate'] = level
+            runs.append(result)
+            print_run(args.mode, level, result)
+        stats = (await client.get('/stats')).json()
+    return runs, stats
+
+
+def print_run(mode, level, result):
+    label = f"concurrency={level}" if mode == 'closed' else f"rate={level}/s"
+    print(f"{label}: {result['overall']['requests_per_second']:.0f} req/s, "
+          f"{result['overall']['trips_per_second']:.0f} trips/s")
+    print(f"  {'endpoint':<10} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, summary in result['endpoints'].items():
+        print(f"  {name:<10} {summary['requests']:>9} {summary['errors']:>7} "
+              f"{summary.get('p50_ms', float('nan')):>9.2f} {summary.get('p95_ms', float('nan')):>9.2f} "
+              f"{summary.get('p99_ms', float('nan')):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Service to test; started on a free local port when omitted')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help='Closed loop: concurrent clients, one run per value')
+    parser.add_argument('--rate', type=float, nargs='+', default=[100.0],
+                        help='Open loop: mean requests per second, one run per value')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('predict=1'),
+                        help='Endpoint weights, e.g. predict=0.9,batch=0.1')
+    parser.add_argument('--batch-size', type=int, default=100, help='Trips per /predict/batch request')
+    parser.add_argument('--unique-trips', type=int, default=10000,
+                        help='Distinct trips to draw from; small pools exercise the prediction cache')
+    parser.add_argument('--warmup', type=int, default=50, help='Requests sent before measuring')
+    parser.add_argument('--max-connections', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='reports/load_test.json')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_server(free_port())
+    try:
+        runs, stats = asyncio.run(run(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'url': url if args.url else 'local',
+        'config': {
+            'mode': args.mode, 'duration': args.duration, 'mix': args.mix,
+            'batch_size': args.batch_size, 'unique_trips': args.unique_trips, 'seed': args.seed,
+        },
+        'service': {'model': stats.get('model'), 'executor': stats.get('executor')},
+        'runs': runs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from typing import Any, NamedTuple
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ScoredBatch(NamedTuple):
+    """What ``score_batch`` may return instead of a bare result list.
+
+    ``meta`` travels back from wherever the batch was scored (a thread or
+    another process) and is handed to the batcher's ``observer``.
+    """
+    results: Any
+    meta: Any = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item requests into one scoring call.
+
+    Items submitted from request handlers are queued; a background task
+    collects whatever arrives within ``max_wait_ms`` of the first item (or
+    until ``max_batch_size`` items are waiting), calls ``score_batch`` once
+    with the list and hands each caller its own result.
+
+    With an ``executor`` the scoring call runs there instead of on the event
+    loop, and up to ``max_concurrency`` batches are scored at once. While
+    every slot is busy new items keep queueing, so batches grow with load.
+
+    ``observer(batch_size, waits, meta)`` is called on the loop after each
+    batch with every item's queueing time and the ``ScoredBatch.meta``.
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=2.0, max_queue_size=0,
+                 executor=None, max_concurrency=1, observer=None):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue_size = max_queue_size
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.observer = observer
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._slots = None
+        self._in_flight = set()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.max_batch_seen = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.total_score_time = 0.0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(self.max_queue_size)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"prediction queue is full ({self.max_queue_size} waiting)")
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = self._loop.create_task(self._process(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _process(self, batch):
+        try:
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            self.total_wait += sum(waits)
+            self.max_wait_seen = max(self.max_wait_seen, max(waits))
+
+            meta = await self._score(batch)
+            if self.observer is not None:
+                self.observer(len(batch), waits, meta)
+
+            self.total_score_time += time.perf_counter() - started
+            self.batches += 1
+            self.items += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        finally:
+            self._slots.release()
+
+    async def _call(self, items):
+        if self.executor is None:
+            scored = self.score_batch(items)
+        else:
+            scored = await self._loop.run_in_executor(self.executor, self.score_batch, items)
+        if isinstance(scored, ScoredBatch):
+            return scored
+        return ScoredBatch(scored)
+
+    async def _score(self, batch):
+        items = [item for item, _, _ in batch]
+        try:
+            scored = await self._call(items)
+        except Exception:
+            # Don't let one bad item fail everyone else in the batch.
+            self.failed_batches += 1
+            for item, future, _ in batch:
+                try:
+                    self._resolve(future, result=(await self._call([item])).results[0])
+                except Exception as e:
+                    self._resolve(future, error=e)
+            return None
+        for (_, future, _), result in zip(batch, scored.results):
+            self._resolve(future, result=result)
+        return scored.meta
+
+    @staticmethod
+    def _resolve(future, result=None, error=None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        batches = self.batches or 1
+        items = self.items or 1
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_queue_size": self.max_queue_size,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches_in_flight": len(self._in_flight),
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "rejected": self.rejected,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.items / batches,
+            "max_batch_seen": self.max_batch_seen,
+            "avg_wait_ms": self.total_wait / items * 1000.0,
+            "max_wait_ms_seen": self.max_wait_seen * 1000.0,
+            "avg_score_ms": self.total_score_time / batches * 1000.0,
+        }
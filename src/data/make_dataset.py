@@ -1,26 +1,175 @@
 # -*- coding: utf-8 -*-
 import click
+import hashlib
+import json
 import logging
+import os
+import sys
+from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import find_dotenv, load_dotenv
 
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+sys.path.insert(0, Path(__file__).resolve().parents[1].joinpath('features').as_posix())
+
+from feature_definitions import pickup_date
+
+MANIFEST = '_manifest.json'
+PARTITION_KEY = 'pickup_date'
+
+# Fixed column types, so every part file in the store shares one schema
+# whatever a single day's file happens to contain.
+RAW_DTYPES = {
+    'id': 'str',
+    'vendor_id': 'int64',
+    'pickup_datetime': 'str',
+    'dropoff_datetime': 'str',
+    'passenger_count': 'int64',
+    'pickup_longitude': 'float64',
+    'pickup_latitude': 'float64',
+    'dropoff_longitude': 'float64',
+    'dropoff_latitude': 'float64',
+    'store_and_fwd_flag': 'str',
+    'trip_duration': 'int64',
+}
+
+# Hive-style directories, pickup_date=YYYY-MM-DD; ISO dates compare as strings.
+PARTITIONING = ds.partitioning(pa.schema([(PARTITION_KEY, pa.string())]), flavor='hive')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_trip_store(path):
+    return os.path.exists(os.path.join(path, MANIFEST))
+
+def load_manifest(store):
+    path = os.path.join(store, MANIFEST)
+    if not os.path.exists(path):
+        return {'files': {}}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(store, manifest):
+    tmp_path = os.path.join(store, f'.{MANIFEST}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store, MANIFEST))
+
+def partition_dir(store, date):
+    return os.path.join(store, f'{PARTITION_KEY}={date}')
+
+def list_partitions(store):
+    prefix = f'{PARTITION_KEY}='
+    return sorted(name[len(prefix):] for name in os.listdir(store) if name.startswith(prefix))
+
+def read_raw(path):
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, dtype={c: t for c, t in RAW_DTYPES.items() if c in header})
+
+def existing_ids(store, date):
+    directory = partition_dir(store, date)
+    if not os.path.isdir(directory):
+        return set()
+    return set(ds.dataset(directory, format='parquet').to_table(columns=['id']).column('id').to_pylist())
+
+def ingest_file(store, path, part_name):
+    """Append one raw file's trips to the store.
+
+    Rows are split by pickup_date, duplicate ids are dropped, both within
+    the file and against what each partition already holds, and the rest is
+    written as one new part file per partition. Only the partitions the
+    file touches are read. Returns {pickup_date: rows written}.
+    """
+    trips = read_raw(path).drop_duplicates('id')
+    dates = pickup_date(trips['pickup_datetime']).astype(str)
+    written = {}
+    for date, day in trips.groupby(dates, sort=True):
+        day = day[~day['id'].isin(existing_ids(store, date))]
+        if day.empty:
+            continue
+        directory = partition_dir(store, date)
+        os.makedirs(directory, exist_ok=True)
+        # Dot-prefixed until complete, so readers never see a partial part.
+        tmp_path = os.path.join(directory, f'.{part_name}.tmp')
+        day.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(directory, part_name))
+        written[date] = len(day)
+    return written
+
+def ingest(input_paths, store):
+    """Ingest every file not already recorded, by content, in the manifest."""
+    logger = logging.getLogger(__name__)
+    os.makedirs(store, exist_ok=True)
+    manifest = load_manifest(store)
+    touched = set()
+    for path in input_paths:
+        name = os.path.basename(path)
+        digest = file_hash(path)
+        if manifest['files'].get(name, {}).get('sha256') == digest:
+            logger.info('%s already ingested, skipping', name)
+            continue
+        written = ingest_file(store, path, f'part-{digest[:16]}.parquet')
+        manifest['files'][name] = {
+            'sha256': digest,
+            'rows': sum(written.values()),
+            'partitions': sorted(written),
+            'ingested_at': datetime.now(timezone.utc).isoformat(),
+        }
+        # Saved after every file, so an interrupted run resumes where it stopped.
+        save_manifest(store, manifest)
+        touched.update(written)
+        logger.info('%s: %d new trips in %d partitions', name, sum(written.values()), len(written))
+    return sorted(touched)
+
+def read_trips(store, start=None, end=None, columns=None):
+    """Trips with pickup_date in [start, end] (ISO dates, either optional).
+
+    The date filter is applied to the partition directories, so only the
+    partitions in range are opened.
+    """
+    dataset = ds.dataset(store, format='parquet', partitioning=PARTITIONING)
+    condition = None
+    if start is not None:
+        condition = ds.field(PARTITION_KEY) >= str(start)
+    if end is not None:
+        upper = ds.field(PARTITION_KEY) <= str(end)
+        condition = upper if condition is None else condition & upper
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
 
 @click.command()
 @click.argument('input_filepath', type=click.Path(exists=True))
 @click.argument('output_filepath', type=click.Path())
-def main(input_filepath, output_filepath):
-    """ Runs data processing scripts to turn raw data from (../raw) into
-        cleaned data ready to be analyzed (saved in ../processed).
+@click.option('--pattern', default='*.csv', show_default=True,
+              help='Raw files to ingest when INPUT_FILEPATH is a directory.')
+def main(input_filepath, output_filepath, pattern):
+    """ Ingests raw trip files from INPUT_FILEPATH (a file or a directory)
+        into the pickup_date-partitioned store at OUTPUT_FILEPATH. Files
+        already ingested are skipped, so a daily run only processes the new
+        day's data.
     """
     logger = logging.getLogger(__name__)
-    logger.info('making final data set from raw data')
+    logger.info('ingesting raw trips into %s', output_filepath)
+
+    source = Path(input_filepath)
+    input_paths = sorted(source.glob(pattern)) if source.is_dir() else [source]
+    touched = ingest([str(path) for path in input_paths], output_filepath)
+    logger.info('%d partitions updated, %d in store', len(touched), len(list_partitions(output_filepath)))
 
 
 if __name__ == '__main__':
     log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     logging.basicConfig(level=logging.INFO, format=log_fmt)
 
-    # not used in this stub but often useful for finding various files
+    # not used here but often useful for finding various files
     project_dir = Path(__file__).resolve().parents[2]
 
     # find .env automagically by walking up directories until it's found, then
@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+
+def default_workers():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def make_executor(kind, workers=None, initializer=None, initargs=()):
+    """Build the pool that CPU-bound scoring is pushed onto.
+
+    "inline" returns None and callers score on the event loop as before.
+    "thread" suits estimators that release the GIL while predicting.
+    "process" spawns workers that run ``initializer`` once at start-up,
+    e.g. to load and warm their own copy of the model.
+    """
+    if kind not in EXECUTOR_KINDS:
+        raise ValueError(f"unknown executor {kind!r}, expected one of {', '.join(EXECUTOR_KINDS)}")
+    workers = workers or default_workers()
+    if kind == "inline":
+        return None
+    if kind == "thread":
+        return ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="inference",
+            initializer=initializer,
+            initargs=initargs,
+        )
+    # Spawn rather than fork: the parent already runs the event loop and
+    # other threads, which fork does not carry over safely.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
@@ -1,11 +1,70 @@
+import os
+import io
 import pathlib
+import argparse
+import collections
+import hashlib
+import itertools
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import shutil
 import sys
+import yaml
+from concurrent.futures import Future, ProcessPoolExecutor
 from sklearn.model_selection import train_test_split
 
-from feature_definitions import feature_build
+from feature_definitions import feature_build, datetime_feature_fix, create_dist_features, create_datetime_features
 
+sys.path.insert(0, pathlib.Path(__file__).resolve().parents[1].joinpath('data').as_posix())
+
+from make_dataset import is_trip_store, read_trips
+
+# Compact on-disk types for the processed data. float32 loses nothing the
+# model can see: scikit-learn trains and predicts on float32 anyway.
+FEATURE_DTYPES = {
+    'vendor_id': 'int8',
+    'passenger_count': 'int8',
+    'pickup_longitude': 'float32',
+    'pickup_latitude': 'float32',
+    'dropoff_longitude': 'float32',
+    'dropoff_latitude': 'float32',
+    'store_and_fwd_flag': 'int8',
+    'trip_duration': 'int32',
+    'distance_haversine': 'float32',
+    'distance_dummy_manhattan': 'float32',
+    'direction': 'float32',
+    'pickup_weekday': 'int8',
+    'pickup_hour': 'int8',
+    'pickup_minute': 'int8',
+    'pickup_dt': 'float32',
+    'pickup_week_hour': 'int16',
+}
+
+OUTPUT_FORMATS = ('parquet', 'csv')
+
+# Files whose contents define the features; editing any of them changes
+# feature_code_version() and so invalidates every cached partition.
+FEATURE_CODE = ('build_features.py', 'feature_definitions.py', 'geo.py', 'temporal.py', 'reference_epoch.json')
+
+do_not_train = ['id','pickup_datetime','dropoff_datetime','pickup_date']
+
+
+def holdout_mask(ids, fraction, seed):
+    """True for the rows held out of training, chosen by a hash of the trip id.
+
+    The same trip lands on the same side in every build mode and on every
+    rerun, however the input is chunked or partitioned.
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(ids), index=False, hash_key=f'{seed:016d}'[-16:])
+    return (hashes.to_numpy() % 10000) < round(fraction * 10000)
+
+def split_holdout(features, fraction, seed):
+    # Returns (train, holdout) without the id column the split is made on.
+    mask = holdout_mask(features['id'], fraction, seed)
+    features = features.drop(columns='id')
+    return features[~mask], features[mask]
 
 def load_data(load_path):
     df = pd.read_csv(load_path)
@@ -15,34 +74,259 @@ def split_data(df,test_size,seed):
     train,test = train_test_split(df, test_size=test_size, random_state=seed)
     return train,test
 
-def save_data(train,test,output_path):
+def compact_dtypes(df):
+    return df.astype({c: t for c, t in FEATURE_DTYPES.items() if c in df.columns})
+
+def save_data(train,test,output_path,fmt='parquet'):
     pathlib.Path(output_path).mkdir(parents=True, exist_ok=True)
-    train.to_csv(output_path + '/train.csv', index = False)
-    test.to_csv(output_path + '/test.csv',index = False)
+    if fmt == 'parquet':
+        compact_dtypes(train).to_parquet(output_path + '/train.parquet', index = False)
+        compact_dtypes(test).to_parquet(output_path + '/test.parquet', index = False)
+    else:
+        train.to_csv(output_path + '/train.csv', index = False)
+        test.to_csv(output_path + '/test.csv',index = False)
+
+def build_chunk(chunk, fmt):
+    datetime_feature_fix(chunk)
+    create_dist_features(chunk)
+    create_datetime_features(chunk)
+    # The trip id is kept so rows can be sent to the holdout when written.
+    features = chunk[['id'] + [f for f in chunk.columns if f not in do_not_train]]
+    return compact_dtypes(features) if fmt == 'parquet' else features
+
+def feature_code_version():
+    features_dir = pathlib.Path(__file__).resolve().parent
+    digest = hashlib.sha256()
+    for name in FEATURE_CODE:
+        digest.update((features_dir / name).read_bytes())
+    digest.update(repr((do_not_train, FEATURE_DTYPES)).encode())
+    return digest.hexdigest()[:16]
+
+def raw_partitions(load_path, rows):
+    """(header, body) bytes for each run of ``rows`` lines of a raw CSV.
+
+    Partitions are cut on line boundaries without parsing, so they can be
+    hashed before deciding whether to build them. The raw trip files hold
+    one record per line.
+    """
+    with open(load_path, 'rb') as f:
+        header = f.readline()
+        while True:
+            body = b''.join(itertools.islice(f, rows))
+            if not body:
+                return
+            yield header, body
+
+def partition_key(header, body, code_version, fmt):
+    digest = hashlib.sha256()
+    for part in (code_version.encode(), fmt.encode(), header, body):
+        digest.update(part)
+    return digest.hexdigest()[:32]
+
+def cache_file_name(code_version, key):
+    # Prefixed with the code version so entries from older feature code can
+    # be found and evicted without reading them.
+    return f'{code_version}-{key}.parquet'
+
+def evict_stale(cache_dir, code_version):
+    """Delete cache entries, finished or partial, written by other feature code.
+
+    Returns the number of files removed.
+    """
+    removed = 0
+    for path in pathlib.Path(cache_dir).iterdir():
+        if path.is_file() and not path.name.startswith(f'{code_version}-'):
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+def build_partition(header, body, fmt, cache_file=None):
+    features = build_chunk(pd.read_csv(io.BytesIO(header + body)), fmt)
+    if cache_file is not None:
+        # Written under a temporary name first, so an interrupted build
+        # never leaves a partial entry behind.
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        features.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+    return features
+
+def submit_partition(pool, header, body, fmt, cache_dir=None, code_version=None):
+    """Start building one partition's features on ``pool``.
+
+    Returns a future for the features and whether they came from the
+    cache, in which case the future is already done and nothing was
+    submitted.
+    """
+    if cache_dir is None:
+        return pool.submit(build_partition, header, body, fmt), False
+    key = partition_key(header, body, code_version, fmt)
+    cache_file = os.path.join(cache_dir, cache_file_name(code_version, key))
+    if not os.path.exists(cache_file):
+        return pool.submit(build_partition, header, body, fmt, cache_file), False
+    hit = Future()
+    hit.set_result(pd.read_parquet(cache_file))
+    return hit, True
+
+class ChunkWriter:
+    """Appends feature chunks to one output file, CSV or Parquet."""
+
+    def __init__(self, output_file, fmt):
+        self.output_file = output_file
+        self.fmt = fmt
+        self.writer = None
+        pathlib.Path(output_file).unlink(missing_ok=True)
+
+    def write(self, features):
+        if self.fmt == 'csv':
+            features.to_csv(self.output_file, mode='a', header=self.writer is None, index=False)
+            self.writer = True
+            return
+        table = pa.Table.from_pandas(features, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.output_file, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.fmt == 'parquet' and self.writer is not None:
+            self.writer.close()
+
+def stream_feature_build(load_path, output_file, chunksize, workers, fmt='parquet', cache_dir=None,
+                         holdout=None):
+    """Build features chunk by chunk across a process pool.
+
+    At most two chunks per worker are held at once and each finished chunk
+    is appended to ``output_file`` before the next is read, so peak memory
+    depends on ``chunksize`` and not on the input size. Parquet output gets
+    one row group per chunk. With ``holdout`` as ``(holdout_file, fraction,
+    seed)`` the rows picked by holdout_mask go to ``holdout_file`` instead.
+
+    With ``cache_dir``, each chunk's features are kept there under a hash
+    of its raw bytes and the feature code version, and chunks already in
+    the cache are read back instead of rebuilt. Entries left by other
+    versions of the feature code are deleted first.
+    """
+    writer = ChunkWriter(output_file, fmt)
+    holdout_writer = ChunkWriter(holdout[0], fmt) if holdout is not None else None
+    code_version = None
+    if cache_dir is not None:
+        pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        code_version = feature_code_version()
+        evicted = evict_stale(cache_dir, code_version)
+        if evicted:
+            print(f"{cache_dir}: {evicted} entries from older feature code removed")
+
+    rows = 0
+    cached = 0
+    pending = collections.deque()
+
+    def write_oldest():
+        nonlocal rows
+        features = pending.popleft().result()
+        if holdout_writer is None:
+            writer.write(features.drop(columns='id'))
+        else:
+            train, held_out = split_holdout(features, *holdout[1:])
+            writer.write(train)
+            holdout_writer.write(held_out)
+        rows += len(features)
+        print(f"{load_path}: {rows} rows written")
+        return features
+
+    features = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for header, body in raw_partitions(load_path, chunksize):
+                future, hit = submit_partition(pool, header, body, fmt, cache_dir, code_version)
+                pending.append(future)
+                cached += hit
+                if len(pending) >= 2 * workers:
+                    features = write_oldest()
+            while pending:
+                features = write_oldest()
+    finally:
+        writer.close()
+        if holdout_writer is not None:
+            holdout_writer.close()
+
+    if cache_dir is not None:
+        print(f"{load_path}: {cached} chunks read from {cache_dir}")
+    return rows, [] if features is None else [f for f in features.columns if f != 'id']
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build model features from the raw trip CSVs.")
+    parser.add_argument('path', help="directory holding the raw train.csv and test.csv, "
+                                     "or a trip store written by make_dataset.py")
+    parser.add_argument('--chunksize', type=int, default=0,
+                        help="stream the input in chunks of this many rows (default: load it whole)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes used to build chunks in streaming mode (default: all cores)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet',
+                        help="processed output format (default: parquet)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="feature cache for streaming mode (default: data/interim/features)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="rebuild every chunk in streaming mode, without reading or writing the cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete every entry in the feature cache before building")
+    parser.add_argument('--start', default=None,
+                        help="trip store only: first pickup_date to read, YYYY-MM-DD")
+    parser.add_argument('--end', default=None,
+                        help="trip store only: last pickup_date to read, YYYY-MM-DD")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
     currdir = pathlib.Path(__file__)
     homedir = currdir.parent.parent.parent
-    path = sys.argv[1]
+    args = parse_args(sys.argv[1:])
+    path = args.path
 
     trainpath = path + 'train.csv'
-    testpath = path + 'test.csv'
-    
-    train_data = pd.read_csv(trainpath)
-    test_data = pd.read_csv(testpath)
     
     output_path = homedir.as_posix()+'/data/processed'
 
+    # The raw test.csv has no trip_duration, so the processed test split is
+    # a holdout of the labelled train rows, never used for training. Every
+    # mode below picks the same trips for it.
+    params = yaml.safe_load(open(homedir.as_posix() + '/params.yaml'))['make_dataset']
+    holdout_fraction, holdout_seed = params['test_split'], params['seed']
+
+    if is_trip_store(path):
+        if args.chunksize:
+            sys.exit("--chunksize streams raw CSVs; read a trip store with --start/--end instead")
+        # Only the pickup_date partitions in range are read.
+        trips = read_trips(path, args.start, args.end).drop(columns='pickup_date')
+        train_data = feature_build(trips)
+        feature_names = [f for f in train_data.columns if f not in do_not_train]
+        print("We have %i features to train." %len(feature_names))
+        train_data, test_data = split_holdout(train_data[['id'] + feature_names], holdout_fraction, holdout_seed)
+        save_data(train_data, test_data, output_path, args.format)
+        sys.exit(0)
+
+    cache_dir = args.cache_dir or homedir.as_posix() + '/data/interim/features'
+    if args.clear_cache:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        print(f"{cache_dir}: cleared")
+
+    if args.chunksize:
+        pathlib.Path(output_path).mkdir(parents=True, exist_ok=True)
+        rows, feature_names = stream_feature_build(
+            trainpath,
+            output_path + '/train.' + args.format,
+            args.chunksize,
+            args.workers or os.cpu_count(),
+            args.format,
+            None if args.no_cache else cache_dir,
+            (output_path + '/test.' + args.format, holdout_fraction, holdout_seed),
+        )
+        print("We have %i features to train." %len(feature_names))
+        sys.exit(0)
+
+    train_data = pd.read_csv(trainpath)
     train_data = feature_build(train_data)
-    test_data = feature_build(test_data)
     
-    do_not_train = ['id','pickup_datetime','dropoff_datetime','check_trip_duration','pickup_date','avg_speed_h','avg_speed_m','pickup_lat_bin','pickup_long_bin','center_lat_bin','center_long_bin','pickup_dt_bin','pickup_datetime_group']
     feature_names = [f for f in train_data.columns if f not in do_not_train]
     print("We have %i features to train." %len(feature_names))
     
-    train_data = train_data[feature_names]
-    test_data = train_data[feature_names] 
+    train_data, test_data = split_holdout(train_data[['id'] + feature_names], holdout_fraction, holdout_seed)
     
-    save_data(train_data, test_data, output_path)
-
-    
\ No newline at end of file
+    save_data(train_data, test_data, output_path, args.format)
@@ -0,0 +1,137 @@
+import numpy as np
+
+AVG_EARTH_RADIUS = 6371
+
+# Rows are processed in blocks of this size so the scratch buffers stay
+# small and cache-resident however long the input is.
+BLOCK_SIZE = 65536
+
+GEO_FEATURES = ['distance_haversine', 'distance_dummy_manhattan', 'direction']
+
+
+def haversine_array(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    lat = lat2 - lat1
+    lng = lng2 - lng1
+    d = np.sin(lat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(lng * 0.5) ** 2
+    h = 2 * AVG_EARTH_RADIUS * np.arcsin(np.sqrt(d))
+    return h
+
+def dummy_manhattan_distance(lat1, lng1, lat2, lng2):
+    a = haversine_array(lat1, lng1, lat1, lng2)
+    b = haversine_array(lat1, lng1, lat2, lng1)
+    return a + b
+
+def bearing_array(lat1, lng1, lat2, lng2):
+    lng_delta_rad = np.radians(lng2 - lng1)
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    y = np.sin(lng_delta_rad) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lng_delta_rad)
+    return np.degrees(np.arctan2(y, x))
+
+
+def geo_features(lat1, lng1, lat2, lng2, out=None, dtype=np.float64):
+    """Haversine, dummy manhattan and bearing for every trip in one pass.
+
+    Returns ``out``, shape (3, n), with rows in GEO_FEATURES order. The
+    radians, cosines and half-angle sines are computed once and shared by
+    all three features, and every intermediate is written into a reused
+    scratch buffer. In float64 the results are bit-identical to
+    haversine_array, dummy_manhattan_distance and bearing_array; float32
+    halves the memory traffic at the cost of precision.
+    """
+    lat1, lng1, lat2, lng2 = (np.asarray(a, dtype=dtype).reshape(-1) for a in (lat1, lng1, lat2, lng2))
+    n = lat1.shape[0]
+    if out is None:
+        out = np.empty((3, n), dtype=dtype)
+    scratch = np.empty((7, min(n, BLOCK_SIZE)), dtype=dtype)
+    for start in range(0, n, BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, n)
+        _geo_block(lat1[start:stop], lng1[start:stop], lat2[start:stop], lng2[start:stop],
+                   out[:, start:stop], scratch[:, :stop - start])
+    return out
+
+def geo_features_scalar(lat1, lng1, lat2, lng2):
+    """Single-trip form of geo_features, returning the three features as a tuple.
+
+    Same fused formulas and operation order, but on NumPy float64 scalars,
+    which cost a fraction of a one-element array ufunc call. Results are
+    bit-identical to the array path.
+    """
+    rlat1 = np.radians(np.float64(lat1))
+    rlat2 = np.radians(np.float64(lat2))
+    cos1 = np.cos(rlat1)
+    cos2 = np.cos(rlat2)
+    sin_dlat = np.sin((rlat2 - rlat1) * 0.5)
+    sin_dlng = np.sin((np.radians(np.float64(lng2)) - np.radians(np.float64(lng1))) * 0.5)
+    sin2_dlat = sin_dlat * sin_dlat
+    sin2_dlng = sin_dlng * sin_dlng
+    diameter = 2 * AVG_EARTH_RADIUS
+
+    haversine = np.arcsin(np.sqrt(sin2_dlat + cos1 * cos2 * sin2_dlng)) * diameter
+    manhattan = (np.arcsin(np.sqrt(cos1 * cos1 * sin2_dlng)) * diameter
+                 + np.arcsin(np.sqrt(sin2_dlat)) * diameter)
+
+    lng_delta_rad = np.radians(np.float64(lng2) - np.float64(lng1))
+    y = np.sin(lng_delta_rad) * cos2
+    x = cos1 * np.sin(rlat2) - np.sin(rlat1) * cos2 * np.cos(lng_delta_rad)
+    return haversine, manhattan, np.degrees(np.arctan2(y, x))
+
+def _geo_block(lat1, lng1, lat2, lng2, out, scratch):
+    # The operation order below mirrors the reference functions above
+    # exactly; keep it that way or float64 parity with training breaks.
+    rlat1, rlat2, cos1, cos2, sin2_dlat, sin2_dlng, tmp = scratch
+    haversine, manhattan, bearing = out
+    diameter = 2 * AVG_EARTH_RADIUS
+
+    np.radians(lat1, out=rlat1)
+    np.radians(lat2, out=rlat2)
+    np.cos(rlat1, out=cos1)
+    np.cos(rlat2, out=cos2)
+
+    np.subtract(rlat2, rlat1, out=sin2_dlat)
+    np.multiply(sin2_dlat, 0.5, out=sin2_dlat)
+    np.sin(sin2_dlat, out=sin2_dlat)
+    np.square(sin2_dlat, out=sin2_dlat)
+
+    np.radians(lng2, out=sin2_dlng)
+    np.radians(lng1, out=tmp)
+    np.subtract(sin2_dlng, tmp, out=sin2_dlng)
+    np.multiply(sin2_dlng, 0.5, out=sin2_dlng)
+    np.sin(sin2_dlng, out=sin2_dlng)
+    np.square(sin2_dlng, out=sin2_dlng)
+
+    # Great-circle distance
+    np.multiply(cos1, cos2, out=tmp)
+    np.multiply(tmp, sin2_dlng, out=tmp)
+    np.add(sin2_dlat, tmp, out=haversine)
+    np.sqrt(haversine, out=haversine)
+    np.arcsin(haversine, out=haversine)
+    np.multiply(haversine, diameter, out=haversine)
+
+    # East-west leg along the pickup latitude plus north-south leg along
+    # the pickup longitude; the zero terms of the reference version drop out.
+    np.multiply(cos1, cos1, out=tmp)
+    np.multiply(tmp, sin2_dlng, out=tmp)
+    np.sqrt(tmp, out=tmp)
+    np.arcsin(tmp, out=tmp)
+    np.multiply(tmp, diameter, out=tmp)
+    np.sqrt(sin2_dlat, out=manhattan)
+    np.arcsin(manhattan, out=manhattan)
+    np.multiply(manhattan, diameter, out=manhattan)
+    np.add(tmp, manhattan, out=manhattan)
+
+    # Initial bearing; reuses the half-angle buffers, which are done with.
+    np.subtract(lng2, lng1, out=tmp)
+    np.radians(tmp, out=tmp)
+    np.sin(tmp, out=bearing)
+    np.multiply(bearing, cos2, out=bearing)
+    np.cos(tmp, out=tmp)
+    np.sin(rlat1, out=sin2_dlat)
+    np.multiply(sin2_dlat, cos2, out=sin2_dlat)
+    np.multiply(sin2_dlat, tmp, out=sin2_dlat)
+    np.sin(rlat2, out=sin2_dlng)
+    np.multiply(cos1, sin2_dlng, out=sin2_dlng)
+    np.subtract(sin2_dlng, sin2_dlat, out=sin2_dlng)
+    np.arctan2(bearing, sin2_dlng, out=bearing)
+    np.degrees(bearing, out=bearing)
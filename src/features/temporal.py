@@ -0,0 +1,70 @@
+import json
+import pathlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# pickup_dt counts seconds from this instant in training, bulk scoring and
+# the API alike. It lives in a file next to the code so every consumer
+# (including the serving image, which ships src/) reads the same value.
+REFERENCE_EPOCH_FILE = pathlib.Path(__file__).with_name('reference_epoch.json')
+
+TEMPORAL_FEATURES = ['pickup_weekday', 'pickup_hour', 'pickup_minute', 'pickup_dt', 'pickup_week_hour']
+
+MINUTES_PER_WEEK = 7 * 24 * 60
+# 1970-01-01 was a Thursday; shifting by three days makes minute 0 of the
+# week Monday 00:00, matching pandas' weekday numbering.
+EPOCH_WEEK_OFFSET = 3 * 24 * 60
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+ONE_SECOND = timedelta(seconds=1)
+
+
+def _minute_of_week_table():
+    minute_of_week = np.arange(MINUTES_PER_WEEK)
+    return {
+        'pickup_weekday': (minute_of_week // (24 * 60)).astype(np.int8),
+        'pickup_hour': (minute_of_week // 60 % 24).astype(np.int8),
+        'pickup_minute': (minute_of_week % 60).astype(np.int8),
+        'pickup_week_hour': (minute_of_week // 60).astype(np.int16),
+    }
+
+# Calendar features for every minute of a Monday-based week; looking rows up
+# here replaces four datetime decompositions per timestamp.
+MINUTE_OF_WEEK = _minute_of_week_table()
+
+
+def load_reference_epoch(path=REFERENCE_EPOCH_FILE):
+    """Reference instant from ``path``, as Unix epoch seconds"""
+    with open(path) as f:
+        reference = json.load(f)['reference_epoch']
+    return int(np.datetime64(reference, 's').astype(np.int64))
+
+REFERENCE_EPOCH = load_reference_epoch()
+
+
+def epoch_seconds(values):
+    """Whole Unix epoch seconds for datetime64 data, a datetime Series or a list of datetimes"""
+    return np.asarray(values, dtype='datetime64[s]').astype(np.int64)
+
+def temporal_features(seconds, reference_epoch=REFERENCE_EPOCH):
+    """The five pickup time features for an array of epoch seconds.
+
+    Returns a dict keyed by TEMPORAL_FEATURES. Calendar fields come from
+    the minute-of-week table with integer arithmetic only; pickup_dt is
+    float64 seconds since ``reference_epoch``. Timestamps are wall-clock
+    times with no time zone, and sub-second parts are dropped.
+    """
+    seconds = np.asarray(seconds, dtype=np.int64)
+    minute_of_week = (seconds // 60 + EPOCH_WEEK_OFFSET) % MINUTES_PER_WEEK
+    features = {name: table[minute_of_week] for name, table in MINUTE_OF_WEEK.items()}
+    features['pickup_dt'] = (seconds - reference_epoch).astype(np.float64)
+    return features
+
+def temporal_features_scalar(pickup, reference_epoch=REFERENCE_EPOCH):
+    """Single-datetime form of temporal_features, as a tuple in TEMPORAL_FEATURES order"""
+    seconds = (pickup - UNIX_EPOCH) // ONE_SECOND
+    minute_of_week = (seconds // 60 + EPOCH_WEEK_OFFSET) % MINUTES_PER_WEEK
+    week_hour = minute_of_week // 60
+    return (minute_of_week // (24 * 60), week_hour % 24, minute_of_week % 60,
+            float(seconds - reference_epoch), week_hour)
@@ -0,0 +1,283 @@
+# zones.py
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Covers the five boroughs and both airports.
+NYC_BOUNDS = (40.49, -74.27, 40.92, -73.68)
+
+HOURS_PER_WEEK = 168
+# Hour slot holding a zone pair's statistics over the whole week, used when
+# the pair has too few trips in the requested hour.
+ALL_HOURS = HOURS_PER_WEEK
+
+STATS = ('trips', 'median_duration', 'avg_speed_kmh')
+
+# Which figures answered a lookup: the pair at that hour of the week, the
+# pair over the whole week, or the whole training set.
+LEVELS = ('pair_hour', 'pair', 'global')
+
+
+class ZoneGrid:
+    """Regular lat/lng grid over NYC_BOUNDS.
+
+    Zones are numbered row-major from the south-west corner. Every point
+    outside the bounds falls into one extra zone, ``outside``, so zone ids
+    are always valid array indices.
+    """
+
+    def __init__(self, cell_degrees=0.01, bounds=NYC_BOUNDS):
+        self.cell_degrees = float(cell_degrees)
+        self.bounds = tuple(float(b) for b in bounds)
+        south, west, north, east = self.bounds
+        self.n_rows = int(np.ceil((north - south) / self.cell_degrees))
+        self.n_cols = int(np.ceil((east - west) / self.cell_degrees))
+        self.outside = self.n_rows * self.n_cols
+        self.n_zones = self.outside + 1
+
+    def bins(self, lat, lng):
+        """Row and column of every point; -1 where it is off the grid"""
+        south, west, _, _ = self.bounds
+        row = np.floor((np.asarray(lat, dtype=np.float64) - south) / self.cell_degrees).astype(np.int64)
+        col = np.floor((np.asarray(lng, dtype=np.float64) - west) / self.cell_degrees).astype(np.int64)
+        off_grid = (row < 0) | (row >= self.n_rows) | (col < 0) | (col >= self.n_cols)
+        row[off_grid] = -1
+        col[off_grid] = -1
+        return row, col
+
+    def zone_of(self, lat, lng):
+        row, col = self.bins(lat, lng)
+        return np.where(row < 0, self.outside, row * self.n_cols + col).astype(np.int32)
+
+    def zone_of_one(self, lat, lng):
+        south, west, _, _ = self.bounds
+        row = math.floor((lat - south) / self.cell_degrees)
+        col = math.floor((lng - west) / self.cell_degrees)
+        if 0 <= row < self.n_rows and 0 <= col < self.n_cols:
+            return row * self.n_cols + col
+        return self.outside
+
+
+def trip_frame(df, grid):
+    """Zone pair, hour of week, duration and speed of every trip with a duration"""
+    duration = df['trip_duration'].to_numpy(dtype=np.float64)
+    valid = duration > 0
+    pickup = grid.zone_of(df['pickup_latitude'].to_numpy()[valid], df['pickup_longitude'].to_numpy()[valid])
+    dropoff = grid.zone_of(df['dropoff_latitude'].to_numpy()[valid], df['dropoff_longitude'].to_numpy()[valid])
+    return pd.DataFrame({
+        'pair': pickup.astype(np.int64) * grid.n_zones + dropoff,
+        'hour': df['pickup_week_hour'].to_numpy()[valid].astype(np.int64),
+        'duration': duration[valid],
+        'speed': df['distance_haversine'].to_numpy(dtype=np.float64)[valid] / (duration[valid] / 3600),
+    })
+
+
+class ZonePairStats:
+    """Trip statistics per (pickup zone, dropoff zone, hour of week).
+
+    Stored as one sorted int64 key column and a value column per statistic.
+    Lookups fall back from the hour to the pair's whole-week figures, and
+    from there to the global figures, when a slot had fewer than
+    ``min_trips`` training trips. ``level`` says which one answered, and
+    ``trips`` is 0 at the global level: no trips back that pair.
+    """
+
+    def __init__(self, grid, keys, values, fallback, min_trips):
+        self.grid = grid
+        self.keys = keys
+        self.values = values
+        self.fallback = fallback
+        self.min_trips = int(min_trips)
+        self._index = None
+
+    @classmethod
+    def build(cls, df, grid, min_trips=5):
+        """Aggregate a training frame with pickup/dropoff coordinates,
+        pickup_week_hour, distance_haversine and trip_duration."""
+        trips = trip_frame(df, grid)
+        aggregations = dict(trips=('duration', 'size'), median_duration=('duration', 'median'),
+                            avg_speed_kmh=('speed', 'mean'))
+        hourly = trips.groupby(['pair', 'hour']).agg(**aggregations).reset_index()
+        weekly = trips.groupby('pair').agg(**aggregations).reset_index().assign(hour=ALL_HOURS)
+        fallback = {
+            'trips': len(trips),
+            'median_duration': float(trips['duration'].median()) if len(trips) else 0.0,
+            'avg_speed_kmh': float(trips['speed'].mean()) if len(trips) else 0.0,
+        }
+        return cls.from_table(pd.concat([hourly, weekly], ignore_index=True), grid, fallback, min_trips)
+
+    @classmethod
+    def from_table(cls, table, grid, fallback, min_trips):
+        """From one row per slot: pair, hour and a column per statistic"""
+        table = table[table['trips'] >= min_trips]
+        keys = table['pair'].to_numpy() * (HOURS_PER_WEEK + 1) + table['hour'].to_numpy()
+        order = np.argsort(keys)
+        values = {
+            'trips': table['trips'].to_numpy(dtype=np.int32)[order],
+            'median_duration': table['median_duration'].to_numpy(dtype=np.float32)[order],
+            'avg_speed_kmh': table['avg_speed_kmh'].to_numpy(dtype=np.float32)[order],
+        }
+        return cls(grid, keys[order].astype(np.int64), values, fallback, min_trips)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + sum(v.nbytes for v in self.values.values())
+
+    def save(self, path):
+        # Renamed into place once complete, so a reload never reads half a file.
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_path,
+            keys=self.keys,
+            cell_degrees=self.grid.cell_degrees,
+            bounds=np.asarray(self.grid.bounds),
+            min_trips=self.min_trips,
+            fallback=np.asarray([self.fallback[name] for name in STATS], dtype=np.float64),
+            **self.values,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            grid = ZoneGrid(float(data['cell_degrees']), tuple(data['bounds']))
+            values = {name: data[name] for name in STATS}
+            fallback = dict(zip(STATS, data['fallback'].tolist()))
+            fallback['trips'] = int(fallback['trips'])
+            return cls(grid, data['keys'], values, fallback, int(data['min_trips']))
+
+    def _rows(self, keys):
+        if not len(self.keys):
+            return np.full(len(keys), -1)
+        position = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[position] == keys, position, -1)
+
+    def lookup(self, pickup_zone, dropoff_zone, week_hour):
+        """Statistics for arrays of zone pairs and hours, as a dict of arrays"""
+        pair = np.asarray(pickup_zone, dtype=np.int64) * self.grid.n_zones + np.asarray(dropoff_zone)
+        rows = self._rows(pair * (HOURS_PER_WEEK + 1) + np.asarray(week_hour, dtype=np.int64))
+        missing = rows < 0
+        rows[missing] = self._rows(pair[missing] * (HOURS_PER_WEEK + 1) + ALL_HOURS)
+        found = rows >= 0
+        level = np.where(missing, 1, 0)
+        level[~found] = 2
+        result = {}
+        for name in STATS:
+            default = 0 if name == 'trips' else self.fallback[name]
+            column = np.full(len(rows), default, dtype=self.values[name].dtype)
+            column[found] = self.values[name][rows[found]]
+            result[name] = column
+        result['level'] = np.asarray(LEVELS)[level]
+        return result
+
+    def lookup_one(self, pickup_zone, dropoff_zone, week_hour):
+        """Statistics for a single trip from a hash index, as a dict"""
+        if self._index is None:
+            self._index = dict(zip(self.keys.tolist(), range(len(self.keys))))
+        pair = (pickup_zone * self.grid.n_zones + dropoff_zone) * (HOURS_PER_WEEK + 1)
+        level = 0
+        row = self._index.get(pair + int(week_hour))
+        if row is None:
+            level = 1
+            row = self._index.get(pair + ALL_HOURS)
+        if row is None:
+            # Same dtypes as the stored columns, so both lookups agree exactly.
+            result = {name: self.values[name].dtype.type(self.fallback[name]).item() for name in STATS}
+            return {**result, 'trips': 0, 'level': LEVELS[2]}
+        return {**{name: self.values[name][row].item() for name in STATS}, 'level': LEVELS[level]}
+
+
+# Log-spaced trip duration bins, one second to two days; each bin spans about
+# 6% of its duration.
+DURATION_EDGES = np.geomspace(1.0, 2 * 86400.0, 201)
+
+
+def histogram_medians(counts, group):
+    """Median per group from (group..., bin, count) rows sorted by group and bin,
+    interpolated geometrically within the bin that holds the middle trip."""
+    cumulative = counts.groupby(group)['count'].cumsum()
+    half = counts.groupby(group)['count'].transform('sum') / 2
+    middle = counts[(cumulative >= half) & (cumulative - counts['count'] < half)]
+    middle = middle.groupby(group).head(1)
+    before = (cumulative - counts['count'])[middle.index]
+    fraction = ((half[middle.index] - before) / middle['count']).clip(0, 1)
+    lower = DURATION_EDGES[middle['bin'].to_numpy()]
+    upper = DURATION_EDGES[middle['bin'].to_numpy() + 1]
+    return middle[group].assign(median_duration=lower * (upper / lower) ** fraction.to_numpy())
+
+
+class ZoneStatsAccumulator:
+    """Builds ZonePairStats chunk by chunk, for data too large to load whole.
+
+    Trip counts and average speeds come out exact. Medians are read off
+    each slot's histogram over DURATION_EDGES: with twenty or more trips
+    they are within about 6% of the exact median, and in smaller slots they
+    fall between the two middle trips rather than on their mean. Memory
+    grows with the number of distinct (zone pair, hour, duration bin) cells
+    seen, not with the number of trips.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.counts = None
+        self.speeds = None
+
+    def add(self, df):
+        trips = trip_frame(df, self.grid)
+        bins = np.searchsorted(DURATION_EDGES, trips['duration'].to_numpy(), side='right') - 1
+        trips['bin'] = np.clip(bins, 0, len(DURATION_EDGES) - 2)
+        counts = trips.groupby(['pair', 'hour', 'bin']).size()
+        speeds = trips.groupby(['pair', 'hour'])['speed'].sum()
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        self.speeds = speeds if self.speeds is None else self.speeds.add(speeds, fill_value=0)
+
+    def finish(self, min_trips=5):
+        if self.counts is None:
+            fallback = {'trips': 0, 'median_duration': 0.0, 'avg_speed_kmh': 0.0}
+            empty = pd.DataFrame(columns=['pair', 'hour', 'trips', 'median_duration', 'avg_speed_kmh'])
+            return ZonePairStats.from_table(empty, self.grid, fallback, min_trips)
+
+        counts = self.counts.rename('count').reset_index()
+        weekly = counts.groupby(['pair', 'bin'], as_index=False)['count'].sum().assign(hour=ALL_HOURS)
+        counts = pd.concat([counts, weekly], ignore_index=True).sort_values(['pair', 'hour', 'bin'],
+                                                                            ignore_index=True)
+        speeds = self.speeds.rename('speed').reset_index()
+        speeds = pd.concat([speeds, speeds.groupby('pair', as_index=False)['speed'].sum().assign(hour=ALL_HOURS)])
+
+        table = counts.groupby(['pair', 'hour'], as_index=False)['count'].sum().rename(columns={'count': 'trips'})
+        table = table.merge(histogram_medians(counts, ['pair', 'hour']), on=['pair', 'hour'])
+        table = table.merge(speeds, on=['pair', 'hour'])
+        table['avg_speed_kmh'] = table['speed'] / table['trips']
+
+        overall = counts[counts['hour'] == ALL_HOURS].groupby('bin', as_index=False)['count'].sum()
+        total = int(overall['count'].sum())
+        fallback = {
+            'trips': total,
+            'median_duration': float(histogram_medians(overall.assign(all=0), ['all'])['median_duration'].iloc[0]),
+            'avg_speed_kmh': float(self.speeds.sum() / total),
+        }
+        return ZonePairStats.from_table(table, self.grid, fallback, min_trips)
+
+
+ZONE_COLUMNS = ['pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude',
+                'pickup_week_hour', 'distance_haversine', 'trip_duration']
+
+
+def build_zone_stats(features_path, output_path, cell_degrees=0.01, min_trips=5):
+    if features_path.endswith('.parquet'):
+        df = pd.read_parquet(features_path, columns=ZONE_COLUMNS)
+    else:
+        df = pd.read_csv(features_path, usecols=ZONE_COLUMNS)
+    stats = ZonePairStats.build(df, ZoneGrid(cell_degrees), min_trips)
+    stats.save(output_path)
+    return stats
+
+
+if __name__ == '__main__':
+    features_path = sys.argv[1]
+    output_path = sys.argv[2]
+    stats = build_zone_stats(features_path, output_path)
+    print(f"Wrote {len(stats.keys)} zone-pair slots ({stats.nbytes / 1e6:.2f} MB) to {output_path}")
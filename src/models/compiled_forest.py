@@ -0,0 +1,225 @@
+# compiled_forest.py
+import json
+import os
+import pathlib
+import shutil
+import sys
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+
+def replace_directory(source, target):
+    """Move directory ``source`` to ``target``, replacing what is there.
+
+    The old target is renamed aside and then deleted, so its files are
+    unlinked rather than overwritten and existing memory maps stay valid.
+    POSIX cannot swap two non-empty directories atomically; ``target`` is
+    missing only between the two renames.
+    """
+    target = pathlib.Path(target)
+    retired = None
+    if target.exists():
+        retired = target.with_name(f'.{target.name}.{os.getpid()}.old')
+        shutil.rmtree(retired, ignore_errors=True)
+        os.replace(target, retired)
+    os.replace(source, target)
+    if retired is not None:
+        # Ignore failures where mapped files can't be deleted (Windows).
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+class CompiledForest:
+    """A fitted regression forest flattened into a handful of NumPy arrays.
+
+    All trees share one node table. ``children[i]`` holds the global indices
+    of node i's left and right child and leaves point back at themselves, so
+    every row can be pushed down every tree with the same fixed number of
+    vectorized steps.
+    """
+
+    # Rows are pushed through the trees in blocks of this many so the
+    # (n_trees, block) working arrays stay in cache.
+    block_size = 2048
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children,
+                                      self.value, self.roots))
+
+    @classmethod
+    def from_sklearn(cls, model):
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            node_ids = np.arange(n, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            left = np.where(is_leaf, node_ids, tree.children_left)
+            right = np.where(is_leaf, node_ids, tree.children_right)
+            children.append(np.stack([left, right], axis=1).astype(np.int32) + offset)
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+        )
+
+    def prune(self, n_trees=None, max_depth=None):
+        """A smaller forest: the first ``n_trees`` trees, cut at ``max_depth``.
+
+        Nodes at the depth cap become leaves predicting their own value, the
+        mean target of the training rows that reached them, and the nodes
+        below them are dropped from the node table.
+        """
+        n_trees = self.n_trees if n_trees is None else min(int(n_trees), self.n_trees)
+        max_depth = self.max_depth if max_depth is None else min(int(max_depth), self.max_depth)
+        end = int(self.roots[n_trees]) if n_trees < self.n_trees else len(self.feature)
+        children = np.asarray(self.children[:end])
+
+        depth = np.full(end, -1, dtype=np.int32)
+        frontier = np.asarray(self.roots[:n_trees], dtype=np.intp)
+        for level in range(max_depth + 1):
+            depth[frontier] = level
+            left, right = children[frontier, 0], children[frontier, 1]
+            split = left != frontier
+            frontier = np.concatenate([left[split], right[split]])
+
+        kept = np.flatnonzero(depth >= 0)
+        new_index = np.full(end, -1, dtype=np.int32)
+        new_index[kept] = np.arange(len(kept), dtype=np.int32)
+        is_leaf = (children[kept, 0] == kept) | (depth[kept] == max_depth)
+        new_children = np.where(is_leaf[:, None], new_index[kept][:, None], new_index[children[kept]])
+        return CompiledForest(
+            feature=np.where(is_leaf, 0, self.feature[kept]).astype(np.int32),
+            threshold=np.where(is_leaf, 0.0, self.threshold[kept]),
+            children=new_children.astype(np.int32),
+            value=np.asarray(self.value[kept]),
+            roots=new_index[self.roots[:n_trees]],
+            max_depth=max_depth,
+            n_features=self.n_features,
+        )
+
+    def save(self, path):
+        """Write the forest to ``path``.
+
+        A ``.npz`` path gives a single compact file. Any other path is
+        treated as a directory holding one raw ``.npy`` per array, which
+        ``load(path, mmap_mode='r')`` can map straight into memory.
+        """
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+        }
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        if str(path).endswith('.npz'):
+            tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+            np.savez(tmp_path, **meta, **arrays)
+            os.replace(tmp_path, path)
+            return
+
+        # Written to a staging directory and swapped in, never over the live
+        # files: a server that memory-mapped the old arrays keeps reading
+        # them, unchanged, until it reloads.
+        directory = pathlib.Path(path)
+        staging = directory.with_name(f'.{directory.name}.{os.getpid()}.new')
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        for name, array in arrays.items():
+            np.save(staging / f'{name}.npy', np.ascontiguousarray(array))
+        (staging / 'meta.json').write_text(json.dumps(meta))
+        replace_directory(staging, directory)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Read a forest written by ``save``.
+
+        With ``mmap_mode='r'`` a directory artifact is mapped rather than
+        read, so every process serving the same file shares one copy of its
+        pages. ``.npz`` files are always read into private memory.
+        """
+        path = pathlib.Path(path)
+        if path.is_dir():
+            meta = json.loads((path / 'meta.json').read_text())
+            arrays = {name: np.load(path / f'{name}.npy', mmap_mode=mmap_mode) for name in ARRAYS}
+        else:
+            with np.load(path) as data:
+                meta = {key: int(data[key]) for key in ('format_version', 'max_depth', 'n_features')}
+                arrays = {name: data[name] for name in ARRAYS}
+
+        if meta['format_version'] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported compiled forest format {meta['format_version']}")
+        return cls(max_depth=meta['max_depth'], n_features=meta['n_features'], **arrays)
+
+    def apply(self, X):
+        """Leaf index reached by every row in every tree, shape (n_trees, n_rows)."""
+        # scikit-learn compares float32 inputs against float64 thresholds;
+        # doing the same keeps the split decisions identical.
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected an array of shape (n, {self.n_features}), got {X.shape}")
+        leaves = np.empty((self.n_trees, X.shape[0]), dtype=np.int32)
+        for start in range(0, X.shape[0], self.block_size):
+            block = X[start:start + self.block_size]
+            leaves[:, start:start + len(block)] = self._apply_block(block)
+        return leaves
+
+    def _apply_block(self, X):
+        flat_X = X.ravel()
+        flat_children = self.children.ravel()
+        row_offsets = np.arange(X.shape[0], dtype=np.intp) * self.n_features
+        node = np.repeat(self.roots.astype(np.intp)[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            x = np.take(flat_X, np.take(self.feature, node) + row_offsets)
+            go_right = ~(x <= np.take(self.threshold, node))
+            node = np.take(flat_children, node * 2 + go_right)
+        return node
+
+    def predict(self, X):
+        return self.value[self.apply(X)].mean(axis=0)
+
+
+def compile_model(model_path, output_path):
+    import joblib
+
+    forest = CompiledForest.from_sklearn(joblib.load(model_path))
+    forest.save(output_path)
+    return forest
+
+
+if __name__ == '__main__':
+    model_path = sys.argv[1]
+    output_path = sys.argv[2]
+    forest = compile_model(model_path, output_path)
+    print(f"Compiled {forest.n_trees} trees ({forest.nbytes / 1e6:.2f} MB) to {output_path}")
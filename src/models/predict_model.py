@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import click
+import logging
+import pathlib
+import sys
+import time
+
+import joblib
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, pathlib.Path(__file__).resolve().parents[1].joinpath('features').as_posix())
+
+from feature_definitions import datetime_feature_fix, create_dist_features, create_datetime_features
+from build_features import ChunkWriter
+from train_model import TARGET, TRAIN_FEATURES
+
+
+def read_chunks(input_path, chunksize):
+    if input_path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(input_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(input_path, chunksize=chunksize)
+
+def count_rows(input_path):
+    # Parquet knows its row count from the footer; CSV would need a full scan.
+    if input_path.endswith('.parquet'):
+        return pq.ParquetFile(input_path).metadata.num_rows
+    return None
+
+def score_chunk(model, chunk):
+    datetime_feature_fix(chunk)
+    create_dist_features(chunk)
+    create_datetime_features(chunk)
+    predictions = pd.DataFrame({TARGET: model.predict(chunk[TRAIN_FEATURES])})
+    if 'id' in chunk.columns:
+        predictions.insert(0, 'id', chunk['id'].values)
+    return predictions
+
+def predict_file(model, input_path, output_path, chunksize):
+    logger = logging.getLogger(__name__)
+    total = count_rows(input_path)
+    fmt = 'parquet' if output_path.endswith('.parquet') else 'csv'
+    writer = ChunkWriter(output_path, fmt)
+
+    rows = 0
+    started = time.perf_counter()
+    try:
+        for chunk in read_chunks(input_path, chunksize):
+            writer.write(score_chunk(model, chunk))
+            rows += len(chunk)
+            elapsed = time.perf_counter() - started
+            rate = rows / elapsed if elapsed else 0.0
+            if total:
+                eta = (total - rows) / rate if rate else 0.0
+                logger.info('%d/%d rows scored (%.0f rows/s, eta %.0fs)', rows, total, rate, eta)
+            else:
+                logger.info('%d rows scored (%.0f rows/s)', rows, rate)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - started
+
+
+@click.command()
+@click.argument('input_filepath', type=click.Path(exists=True))
+@click.argument('output_filepath', type=click.Path())
+@click.option('--model', 'model_path', default='models/model.joblib', show_default=True,
+              type=click.Path(exists=True), help='Trained model to score with.')
+@click.option('--chunksize', default=200000, show_default=True,
+              help='Rows read, featurized and scored at a time.')
+@click.option('--n-jobs', default=-1, show_default=True,
+              help='Cores the forest predicts on (-1 for all).')
+def main(input_filepath, output_filepath, model_path, chunksize, n_jobs):
+    """ Scores a raw trips file (CSV or Parquet) in chunks and writes one
+        predicted trip_duration per trip to OUTPUT_FILEPATH (.csv or .parquet).
+    """
+    logger = logging.getLogger(__name__)
+    logger.info('scoring %s with %s', input_filepath, model_path)
+
+    model = joblib.load(model_path)
+    model.n_jobs = n_jobs
+
+    pathlib.Path(output_filepath).parent.mkdir(parents=True, exist_ok=True)
+    rows, elapsed = predict_file(model, input_filepath, output_filepath, chunksize)
+    logger.info('wrote %d predictions to %s in %.1fs (%.0f rows/s)',
+                rows, output_filepath, elapsed, rows / elapsed if elapsed else 0.0)
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import click
+import json
+import logging
+import pathlib
+import time
+
+import joblib
+import numpy as np
+
+from compiled_forest import CompiledForest
+from train_model import TARGET, TRAIN_FEATURES, load_features
+from tune_model import rmsle
+
+
+def tree_counts(n_trees):
+    # Roughly doubling steps, always ending on the full forest.
+    counts = {n_trees}
+    n = 1
+    while n < n_trees:
+        counts.add(n)
+        n *= 2
+    return sorted(counts)
+
+def predict_latency(forest, X, repeats):
+    """Median seconds for one predict call on ``X``"""
+    forest.predict(X)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        forest.predict(X)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+def sweep(forest, X, y, latency_rows, repeats):
+    """Error, latency and size of the forest for every tree count and depth cap"""
+    results = []
+    for n_trees in tree_counts(forest.n_trees):
+        for max_depth in range(1, forest.max_depth + 1):
+            pruned = forest.prune(n_trees, max_depth)
+            results.append({
+                'n_trees': n_trees,
+                'max_depth': max_depth,
+                'rmsle': rmsle(y, pruned.predict(X)),
+                'latency_ms': predict_latency(pruned, X[:latency_rows], repeats) * 1e3,
+                'nbytes': pruned.nbytes,
+            })
+    return results
+
+def choose(results, max_rmsle, latency_budget_ms=None, memory_budget_mb=None):
+    """Smallest forest within the error threshold and both budgets, or None"""
+    fits = [
+        r for r in results
+        if r['rmsle'] <= max_rmsle
+        and (latency_budget_ms is None or r['latency_ms'] <= latency_budget_ms)
+        and (memory_budget_mb is None or r['nbytes'] <= memory_budget_mb * 1e6)
+    ]
+    return min(fits, key=lambda r: (r['nbytes'], r['latency_ms']), default=None)
+
+@click.command()
+@click.argument('model_path', type=click.Path(exists=True))
+@click.argument('validation_path', type=click.Path(exists=True))
+@click.argument('output_path', type=click.Path())
+@click.option('--max-error-increase', default=0.01, show_default=True,
+              help='Allowed RMSLE increase over the full forest, as a fraction.')
+@click.option('--latency-budget-ms', type=float, help='Largest acceptable predict latency.')
+@click.option('--memory-budget-mb', type=float, help='Largest acceptable compiled forest size.')
+@click.option('--latency-rows', default=1, show_default=True,
+              help='Rows per predict call when timing; 1 matches a /predict request.')
+@click.option('--repeats', default=50, show_default=True, help='Timed predict calls per candidate.')
+@click.option('--report', default='reports/pruning.json', show_default=True, type=click.Path())
+def main(model_path, validation_path, output_path, max_error_increase, latency_budget_ms,
+         memory_budget_mb, latency_rows, repeats, report):
+    """ Measures how validation error, predict latency and compiled size
+        change as the forest in MODEL_PATH loses trees or depth, and writes
+        the smallest forest that stays within the budgets to OUTPUT_PATH as
+        a compiled forest the API can serve (COMPILED_MODEL_PATH).
+    """
+    logger = logging.getLogger(__name__)
+    forest = CompiledForest.from_sklearn(joblib.load(model_path))
+    validation = load_features(validation_path, TRAIN_FEATURES + [TARGET])
+    X = validation[TRAIN_FEATURES].to_numpy(dtype=np.float32)
+    y = validation[TARGET].to_numpy(dtype=np.float64)
+
+    full = {
+        'n_trees': forest.n_trees,
+        'max_depth': forest.max_depth,
+        'rmsle': rmsle(y, forest.predict(X)),
+        'latency_ms': predict_latency(forest, X[:latency_rows], repeats) * 1e3,
+        'nbytes': forest.nbytes,
+    }
+    logger.info('full forest: %d trees, depth %d, rmsle %.4f, %.3f ms, %.2f MB', full['n_trees'],
+                full['max_depth'], full['rmsle'], full['latency_ms'], full['nbytes'] / 1e6)
+
+    results = sweep(forest, X, y, latency_rows, repeats)
+    click.echo(f"{'trees':>6} {'depth':>6} {'rmsle':>8} {'ms':>8} {'MB':>8}")
+    for r in results:
+        click.echo(f"{r['n_trees']:>6} {r['max_depth']:>6} {r['rmsle']:>8.4f} "
+                   f"{r['latency_ms']:>8.3f} {r['nbytes'] / 1e6:>8.3f}")
+
+    max_rmsle = full['rmsle'] * (1 + max_error_increase)
+    best = choose(results, max_rmsle, latency_budget_ms, memory_budget_mb)
+
+    pathlib.Path(report).parent.mkdir(parents=True, exist_ok=True)
+    with open(report, 'w') as f:
+        json.dump({'full': full, 'max_rmsle': max_rmsle, 'latency_rows': latency_rows,
+                   'latency_budget_ms': latency_budget_ms, 'memory_budget_mb': memory_budget_mb,
+                   'chosen': best, 'candidates': results}, f, indent=2)
+    if best is None:
+        raise click.ClickException(f'no pruned forest within rmsle {max_rmsle:.4f} and the given budgets; '
+                                   f'see {report}')
+
+    forest.prune(best['n_trees'], best['max_depth']).save(output_path)
+    logger.info('wrote %d trees at depth %d to %s: rmsle %.4f, %.3f ms, %.2f MB (%.0f%% of full size)',
+                best['n_trees'], best['max_depth'], output_path, best['rmsle'], best['latency_ms'],
+                best['nbytes'] / 1e6, 100 * best['nbytes'] / full['nbytes'])
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -1,27 +1,258 @@
 # train_model.py
+import json
+import os
 import pathlib
 import sys
+import time
 import yaml
 import joblib
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 from sklearn.ensemble import RandomForestRegressor
 
+from compiled_forest import CompiledForest
 
-def train_model(train_features, target, n_estimators, max_depth, seed):
-    model = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=seed)
-    model.fit(train_features, target)
+sys.path.insert(0, pathlib.Path(__file__).resolve().parents[1].joinpath('features').as_posix())
+
+from zones import ZONE_COLUMNS, ZoneGrid, ZonePairStats, ZoneStatsAccumulator
+
+
+TARGET = 'trip_duration'
+
+# Column order the model is fitted on; src/service.py builds the same 15
+# columns in the same order at serving time.
+TRAIN_FEATURES = [
+    'vendor_id', 'passenger_count', 'pickup_longitude', 'pickup_latitude',
+    'dropoff_longitude', 'dropoff_latitude', 'store_and_fwd_flag',
+    'distance_haversine', 'distance_dummy_manhattan', 'direction',
+    'pickup_weekday', 'pickup_hour', 'pickup_minute', 'pickup_dt', 'pickup_week_hour'
+]
+
+# Working set of a worker growing one tree, per training row: float64 copy
+# of the target, bootstrap weights, sample indices and a float32 feature
+# buffer. The feature matrix itself is memory-mapped and shared by workers.
+TREE_BYTES_PER_ROW = 8 + 8 + 8 + 4
+
+
+def load_features(data_path, columns):
+    # Parquet reads only the requested columns, already typed; CSV is still
+    # accepted for processed data written with --format csv.
+    if data_path.endswith('.parquet'):
+        return pd.read_parquet(data_path, columns=columns)
+    return pd.read_csv(data_path, usecols=columns)[columns]
+
+def count_rows(data_path, chunksize=1_000_000):
+    if data_path.endswith('.parquet'):
+        return pq.ParquetFile(data_path).metadata.num_rows
+    # Counted by the reader iter_feature_chunks uses, one column at a time,
+    # so quoted newlines and a missing final newline count as it sees them.
+    first_column = pd.read_csv(data_path, nrows=0).columns[:1]
+    return sum(len(chunk) for chunk in pd.read_csv(data_path, usecols=first_column, chunksize=chunksize))
+
+def iter_feature_chunks(data_path, columns, chunksize):
+    # Chunks of at most chunksize rows, as float32: the dtype the forest
+    # fits on anyway, at half the memory of the float64 columns on disk.
+    if data_path.endswith('.parquet'):
+        batches = pq.ParquetFile(data_path).iter_batches(batch_size=chunksize, columns=columns)
+        chunks = (batch.to_pandas() for batch in batches)
+    else:
+        chunks = pd.read_csv(data_path, usecols=columns, chunksize=chunksize)
+    for chunk in chunks:
+        yield chunk[columns].astype(np.float32)
+
+def available_memory():
+    """Bytes still available to this process, or None when unknown.
+
+    MemAvailable from /proc/meminfo, capped by the cgroup v2 limit when
+    running in a container.
+    """
+    available = None
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    try:
+        with open('/sys/fs/cgroup/memory.max') as f:
+            limit = f.read().strip()
+        with open('/sys/fs/cgroup/memory.current') as f:
+            usage = int(f.read())
+        if limit != 'max':
+            headroom = max(0, int(limit) - usage)
+            available = headroom if available is None else min(available, headroom)
+    except (OSError, ValueError):
+        pass
+    return available
+
+def plan_workers(n_jobs, n_rows, n_trees, memory_fraction):
+    # n_jobs follows joblib: -1 is every core, -2 all but one, and so on.
+    workers = min(joblib.effective_n_jobs(n_jobs), n_trees)
+    available = available_memory()
+    if available is not None:
+        per_worker = max(1, n_rows * TREE_BYTES_PER_ROW)
+        workers = min(workers, int(available * memory_fraction // per_worker))
+    return max(1, workers), available
+
+def _fit_tree(X, y, max_depth, seed):
+    started = time.perf_counter()
+    forest = RandomForestRegressor(n_estimators=1, max_depth=max_depth, random_state=seed)
+    forest.fit(X, y)
+    return forest, time.perf_counter() - started
+
+def _fit_trees(X, y, max_depth, seeds, workers):
+    started = time.perf_counter()
+    fitted = joblib.Parallel(n_jobs=workers, backend='loky')(
+        joblib.delayed(_fit_tree)(X, y, max_depth, tree_seed) for tree_seed in seeds
+    )
+    return fitted, time.perf_counter() - started
+
+def train_model_parallel(train_features, target, n_estimators, max_depth, seed, n_jobs=1, memory_fraction=0.5,
+                         measure_speedup=False):
+    """Fit the forest one tree per task across worker processes.
+
+    Each tree gets its own seed drawn from ``seed``, so the forest is the
+    same whatever the number of workers. Workers are capped by the cores
+    asked for and by how many tree working sets fit in ``memory_fraction``
+    of the available memory. Returns the model and a timing report.
+
+    With ``measure_speedup`` the same forest is also fitted on one worker
+    first, and the report gives the measured wall-clock speedup over it.
+    """
+    workers, available = plan_workers(n_jobs, len(train_features), n_estimators, memory_fraction)
+    seeds = np.random.RandomState(seed).randint(np.iinfo(np.int32).max, size=n_estimators)
+    serial_seconds = None
+    if measure_speedup and workers > 1:
+        _, serial_seconds = _fit_trees(train_features, target, max_depth, seeds, 1)
+    fitted, wall_seconds = _fit_trees(train_features, target, max_depth, seeds, workers)
+    if measure_speedup and workers == 1:
+        serial_seconds = wall_seconds
+
+    model = fitted[0][0]
+    model.estimators_ = [forest.estimators_[0] for forest, _ in fitted]
+    model.n_estimators = n_estimators
+    model.random_state = seed
+    tree_seconds = [seconds for _, seconds in fitted]
+    report = {
+        'n_jobs': n_jobs,
+        'workers': workers,
+        'available_memory_bytes': available,
+        'rows': len(train_features),
+        'tree_seconds': tree_seconds,
+        'total_tree_seconds': sum(tree_seconds),
+        'wall_seconds': wall_seconds,
+        # Trees being fitted at once, on average. Not a speedup over a serial
+        # fit: per-tree times grow when workers contend for cores and memory.
+        'parallelism': sum(tree_seconds) / wall_seconds if wall_seconds else 1.0,
+        # Measured against a one-worker fit of the same trees, when asked for.
+        'serial_wall_seconds': serial_seconds,
+        'speedup': serial_seconds / wall_seconds if serial_seconds and wall_seconds else None,
+    }
+    return model, report
+
+def print_training_report(report):
+    tree_seconds = np.asarray(report['tree_seconds'])
+    print(f"{len(tree_seconds)} trees on {report['workers']} worker(s): "
+          f"per tree min {tree_seconds.min():.3f}s, median {np.median(tree_seconds):.3f}s, "
+          f"max {tree_seconds.max():.3f}s")
+    print(f"wall clock {report['wall_seconds']:.2f}s for {report['total_tree_seconds']:.2f}s of tree fitting, "
+          f"parallelism {report['parallelism']:.2f}")
+    if report['speedup'] is not None:
+        print(f"serial fit {report['serial_wall_seconds']:.2f}s, speedup {report['speedup']:.2f}x "
+              f"on {report['workers']} worker(s)")
+
+def save_training_report(report, output_path):
+    with open(output_path + '/train_report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+def train_model_streaming(data_path, n_estimators, max_depth, seed, chunksize, n_jobs=1, memory_fraction=0.5):
+    """Fit the forest chunk by chunk, never fitting on more than ``chunksize`` rows.
+
+    Trees are shared out over the chunks in proportion to their rows and
+    each tree is fitted on a bootstrap sample of the rows read since the
+    previous fit; warm_start keeps the trees already grown while the next
+    ones are added. When there are more chunks than trees, those rows are
+    cut down to a uniform sample of ``chunksize`` as they are read, so at
+    most two chunks are held at once. A fit's trees are grown on
+    scikit-learn's threads, which share its rows.
+    """
+    n_rows = count_rows(data_path)
+    workers, _ = plan_workers(n_jobs, chunksize, n_estimators, memory_fraction)
+    model = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth,
+                                  random_state=seed, warm_start=True, n_jobs=workers)
+    rng = np.random.default_rng(seed)
+    pending = None
+    pending_keys = None
+    rows_seen = 0
+    grown = 0
+    for chunk in iter_feature_chunks(data_path, TRAIN_FEATURES + [TARGET], chunksize):
+        rows_seen += len(chunk)
+        keys = rng.random(len(chunk))
+        if pending is not None:
+            # Rows not yet fitted: short Parquet batches at row-group ends,
+            # or whole chunks when trees are fewer than chunks.
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+            keys = np.concatenate([pending_keys, keys])
+        if len(chunk) > chunksize:
+            # The rows with the smallest random keys are a uniform sample.
+            keep = np.sort(np.argpartition(keys, chunksize)[:chunksize])
+            chunk = chunk.iloc[keep].reset_index(drop=True)
+            keys = keys[keep]
+        pending, pending_keys = chunk, keys
+        trees = n_estimators if rows_seen >= n_rows else round(n_estimators * rows_seen / n_rows)
+        if trees <= grown:
+            continue
+        model.n_estimators = trees
+        model.fit(pending[TRAIN_FEATURES], pending[TARGET])
+        pending = pending_keys = None
+        grown = trees
+        print(f"fitted {grown}/{n_estimators} trees on {rows_seen}/{n_rows} rows")
+    if rows_seen != n_rows or grown != n_estimators:
+        raise ValueError(f"{data_path}: fitted {grown} of {n_estimators} trees on {rows_seen} rows, "
+                         f"expected {n_rows} rows")
+    model.warm_start = False
     return model
 
 def save_model(model, output_path):
-    joblib.dump(model, output_path + '/model.joblib')
+    # Dumped next to the target and renamed over it, so a server that
+    # memory-mapped the old file (MODEL_MMAP) never sees it rewritten.
+    tmp_path = output_path + f'/.model.joblib.{os.getpid()}.tmp'
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, output_path + '/model.joblib')
+
+def save_compiled_model(model, output_path):
+    # Flat-array copy of the forest that the API serves by default, stored
+    # as raw .npy files so serving processes can memory-map it
+    CompiledForest.from_sklearn(model).save(output_path + '/model_compiled')
+
+def save_zone_stats(train_features, output_path, cell_degrees, min_trips):
+    # Per zone-pair duration and speed by hour of week, served next to the
+    # model's predictions.
+    stats = ZonePairStats.build(train_features, ZoneGrid(cell_degrees), min_trips)
+    stats.save(output_path + '/zone_stats.npz')
+    return stats
+
+def save_zone_stats_streaming(data_path, output_path, chunksize, cell_degrees, min_trips):
+    # Same statistics as save_zone_stats, one chunk at a time; medians are
+    # approximate (see ZoneStatsAccumulator).
+    accumulator = ZoneStatsAccumulator(ZoneGrid(cell_degrees))
+    for chunk in iter_feature_chunks(data_path, ZONE_COLUMNS, chunksize):
+        accumulator.add(chunk)
+    stats = accumulator.finish(min_trips)
+    stats.save(output_path + '/zone_stats.npz')
+    return stats
 
 def main():
 
     curr_dir = pathlib.Path(__file__)
     home_dir = curr_dir.parent.parent.parent
     params_file = home_dir.as_posix() + '/params.yaml'
-    params = yaml.safe_load(open(params_file))["train_model"]
+    all_params = yaml.safe_load(open(params_file))
+    params = all_params["train_model"]
 
     input_file = sys.argv[1]
     data_path =  input_file 
@@ -31,14 +262,28 @@ def main():
     
     pathlib.Path(output_path).mkdir(parents=True, exist_ok=True)
     
-    TARGET = 'trip_duration'
-    train_features = pd.read_csv(data_path)
-    X = train_features.drop(TARGET, axis=1)
-    y = train_features[TARGET]
     print("Reached train model")
-    trained_model = train_model(X, y, params['n_estimators'], params['max_depth'], params['seed'])
+    chunksize = params.get('chunksize', 0)
+    n_jobs = params.get('n_jobs', 1)
+    memory_fraction = params.get('memory_fraction', 0.5)
+    measure_speedup = params.get('measure_speedup', False)
+    if chunksize:
+        # Out-of-core: the forest and the zone stats each see one chunk at a time.
+        trained_model = train_model_streaming(data_path, params['n_estimators'], params['max_depth'],
+                                              params['seed'], chunksize, n_jobs, memory_fraction)
+        save_zone_stats_streaming(data_path, output_path, chunksize, **all_params["zones"])
+    else:
+        train_features = load_features(data_path, TRAIN_FEATURES + [TARGET])
+        X = train_features[TRAIN_FEATURES].astype(np.float32)
+        y = train_features[TARGET]
+        trained_model, report = train_model_parallel(X, y, params['n_estimators'], params['max_depth'],
+                                                     params['seed'], n_jobs, memory_fraction, measure_speedup)
+        print_training_report(report)
+        save_training_report(report, output_path)
+        save_zone_stats(train_features, output_path, **all_params["zones"])
     print("model trained")
     save_model(trained_model, output_path)
+    save_compiled_model(trained_model, output_path)
     print("model saved")
 
     
@@ -0,0 +1,167 @@
+# tune_model.py
+import hashlib
+import itertools
+import json
+import pathlib
+import re
+import sys
+import time
+import yaml
+import joblib
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+from train_model import TARGET, TRAIN_FEATURES, load_features, plan_workers
+
+# Parameters the search may set; train_model reads the same keys.
+TUNED_PARAMS = ('n_estimators', 'max_depth')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def candidate_key(params, rows, data_hash, settings):
+    # Everything a candidate's score depends on: its parameters, the data,
+    # the features fitted on and how the data was split and subsampled.
+    key = {'params': params, 'rows': rows, 'data': data_hash, 'features': TRAIN_FEATURES, **settings}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:24]
+
+def expand_grid(grid):
+    names = [name for name in TUNED_PARAMS if name in grid]
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def split_holdout(X, y, validation_split, seed):
+    # Shuffled once, so any prefix of the training part is a random sample.
+    order = np.random.RandomState(seed).permutation(len(X))
+    n_valid = int(len(X) * validation_split)
+    return X[order[n_valid:]], y[order[n_valid:]], X[order[:n_valid]], y[order[:n_valid]]
+
+def rmsle(y_true, y_pred):
+    return float(np.sqrt(np.mean((np.log1p(np.maximum(y_pred, 0)) - np.log1p(y_true)) ** 2)))
+
+def _score_candidate(X_train, y_train, X_valid, y_valid, params, rows, seed):
+    started = time.perf_counter()
+    model = RandomForestRegressor(random_state=seed, **params)
+    model.fit(X_train[:rows], y_train[:rows])
+    score = rmsle(y_valid, model.predict(X_valid))
+    return {'params': params, 'rows': rows, 'rmsle': score, 'seconds': time.perf_counter() - started}
+
+class ScoreCache:
+    """One JSON file per scored candidate, named by its candidate_key."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+
+    def get(self, key):
+        path = self.cache_dir / f'{key}.json'
+        if not path.exists():
+            return None
+        self.hits += 1
+        with open(path) as f:
+            return json.load(f)
+
+    def put(self, key, result):
+        with open(self.cache_dir / f'{key}.json', 'w') as f:
+            json.dump(result, f)
+
+def score_round(candidates, rows, data, cache, data_hash, settings, n_jobs, memory_fraction):
+    """Scores for every candidate at ``rows`` training rows, fitting only
+    those not already in the cache, in parallel worker processes."""
+    keys = [candidate_key(params, rows, data_hash, settings) for params in candidates]
+    results = [cache.get(key) for key in keys]
+    todo = [i for i, result in enumerate(results) if result is None]
+    if todo:
+        workers, _ = plan_workers(n_jobs, rows, len(todo), memory_fraction)
+        fitted = joblib.Parallel(n_jobs=workers, backend='loky')(
+            joblib.delayed(_score_candidate)(*data, candidates[i], rows, settings['seed']) for i in todo
+        )
+        for i, result in zip(todo, fitted):
+            cache.put(keys[i], result)
+            results[i] = result
+    for result in results:
+        print(f"  {result['params']} on {result['rows']} rows: rmsle {result['rmsle']:.4f}")
+    return results
+
+def search(candidates, data, cache, data_hash, settings, tune_params):
+    """Successive halving: score every candidate on a small sample, keep the
+    best 1/factor, and rescore the survivors on factor times the rows until
+    one is left or the full training set is reached. ``grid`` scores every
+    candidate once on all rows."""
+    n_train = len(data[0])
+    factor = tune_params.get('halving_factor', 3)
+    if tune_params.get('search', 'halving') == 'grid':
+        rows = n_train
+    else:
+        rounds = int(np.ceil(np.log(len(candidates)) / np.log(factor))) if len(candidates) > 1 else 0
+        rows = max(min(tune_params.get('min_rows', 1000), n_train), n_train // factor ** rounds)
+
+    history = []
+    while True:
+        print(f"round {len(history) + 1}: {len(candidates)} candidates on {rows} rows")
+        results = score_round(candidates, rows, data, cache, data_hash, settings,
+                              tune_params.get('n_jobs', -1), tune_params.get('memory_fraction', 0.5))
+        results.sort(key=lambda result: result['rmsle'])
+        history.append({'rows': rows, 'results': results})
+        if len(results) == 1 or rows >= n_train:
+            return results[0], history
+        candidates = [result['params'] for result in results[:max(1, len(results) // factor)]]
+        rows = min(n_train, rows * factor)
+
+def write_params(params_file, section, values):
+    # Edit the keys in place, keeping the comments and layout of the file.
+    lines = open(params_file).read().splitlines(keepends=True)
+    in_section = False
+    for i, line in enumerate(lines):
+        if not line.startswith((' ', '\n', '#')):
+            in_section = line.rstrip() == f'{section}:'
+            continue
+        match = re.match(r'(\s+)(\w+):', line)
+        if in_section and match and match.group(2) in values:
+            lines[i] = f'{match.group(1)}{match.group(2)}: {values[match.group(2)]}\n'
+    with open(params_file, 'w') as f:
+        f.writelines(lines)
+
+def main():
+
+    curr_dir = pathlib.Path(__file__)
+    home_dir = curr_dir.parent.parent.parent
+    params_file = home_dir.as_posix() + '/params.yaml'
+    all_params = yaml.safe_load(open(params_file))
+    tune_params = all_params["tune_model"]
+
+    data_path = sys.argv[1]
+    print(f"Data: {data_path}")
+    report_path = sys.argv[2] if len(sys.argv) > 2 else home_dir.as_posix() + '/reports/tuning.json'
+
+    # Featurize and split once; every candidate in every round reuses these
+    # float32 arrays, which worker processes share through memory-mapping.
+    train_features = load_features(data_path, TRAIN_FEATURES + [TARGET])
+    X = train_features[TRAIN_FEATURES].to_numpy(dtype=np.float32)
+    y = train_features[TARGET].to_numpy(dtype=np.float64)
+    del train_features
+    settings = {'validation_split': tune_params.get('validation_split', 0.2), 'seed': tune_params.get('seed', 21)}
+    data = split_holdout(X, y, settings['validation_split'], settings['seed'])
+
+    cache = ScoreCache(home_dir / tune_params.get('cache_dir', '.tune_cache'))
+    candidates = expand_grid(tune_params['grid'])
+    started = time.perf_counter()
+    best, history = search(candidates, data, cache, file_hash(data_path), settings, tune_params)
+    print(f"best {best['params']}: rmsle {best['rmsle']:.4f} ({cache.hits} cached scores reused)")
+
+    write_params(params_file, 'train_model', best['params'])
+    pathlib.Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump({'best': best, 'rounds': history, 'cache_hits': cache.hits,
+                   'seconds': time.perf_counter() - started}, f, indent=2)
+    print(f"wrote {best['params']} to {params_file}")
+
+
+if __name__ == "__main__":
+    main()
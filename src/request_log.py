@@ -0,0 +1,168 @@
+import json
+import logging
+import logging.handlers
+import pathlib
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+_STOP = object()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller.
+
+    Records arriving at a full queue are counted and dropped, and records are
+    queued unformatted: JSON encoding happens on the writer thread.
+    """
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the record's ``payload`` merged in.
+
+    ``features`` optionally maps a logged ``trip`` to its model features, so
+    the features are rebuilt off the request path rather than carried along
+    with every request.
+    """
+
+    def __init__(self, features=None):
+        super().__init__()
+        self.features = features
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "payload", {}))
+        if self.features is not None and entry.get("trip") and "features" not in entry:
+            try:
+                entry["features"] = self.features(entry["trip"])
+            except Exception:
+                # Error records may carry a trip the features can't be built from.
+                entry["features"] = None
+        return json.dumps(entry, default=str)
+
+
+class RequestLogger:
+    """Structured request log written by a background thread.
+
+    Callers only build a LogRecord and put it on a bounded queue. The writer
+    thread formats records and appends them to ``path`` in batches of up to
+    ``buffer_size`` lines, flushing at least every ``flush_interval`` seconds.
+    ``sample_rate`` is the fraction of predictions logged; errors are always
+    logged. An empty ``path`` disables logging.
+    """
+
+    def __init__(self, path, sample_rate=1.0, queue_size=10000, buffer_size=256,
+                 flush_interval=1.0, features=None, name="trip_duration_api.requests"):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.buffer_size = max(1, buffer_size)
+        self.flush_interval = flush_interval
+        self.formatter = JsonFormatter(features)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.written = 0
+        self.errors = 0
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if not self.enabled or self.running:
+            return
+        pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._stream = open(self.path, "a", encoding="utf-8")
+        self.logger.addHandler(self.handler)
+        self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Detach from the logger and wait for queued records to be written."""
+        if not self.running:
+            return
+        self.logger.removeHandler(self.handler)
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._stream.close()
+
+    def sample(self):
+        if not self.running:
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def log(self, message, level=logging.INFO, **payload):
+        if self.running:
+            self.logger.log(level, message, extra={"payload": payload})
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "sample_rate": self.sample_rate,
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.handler.dropped,
+            "errors": self.errors,
+        }
+
+    def _run(self):
+        buffer = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            if record is _STOP:
+                self._write(buffer)
+                return
+            if record is not None:
+                buffer.append(record)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if buffer and (record is None or len(buffer) >= self.buffer_size):
+                self._write(buffer)
+                buffer = []
+                deadline = None
+
+    def _write(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                self.errors += 1
+        if lines:
+            self._stream.write("\n".join(lines) + "\n")
+            self._stream.flush()
+            self.written += len(lines)
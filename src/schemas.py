@@ -0,0 +1,44 @@
+from typing import Annotated, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, NaiveDatetime, TypeAdapter
+
+# Finite and on the globe: NaN or infinity would reach the zone grid and the
+# model as garbage. Points outside NYC are still accepted.
+Latitude = Annotated[float, Field(ge=-90, le=90, allow_inf_nan=False)]
+Longitude = Annotated[float, Field(ge=-180, le=180, allow_inf_nan=False)]
+
+
+class Trip(BaseModel):
+    """One trip as sent to /predict.
+
+    Validation, JSON decoding and ISO-8601 parsing all run in pydantic-core,
+    so a request body goes from bytes to typed values in one pass.
+    Timestamps are NYC wall-clock times, as in the training data; values
+    with a UTC offset are rejected rather than silently shifted.
+    """
+    model_config = ConfigDict(extra="ignore")
+
+    vendor_id: int = 1
+    passenger_count: int = 1
+    pickup_datetime: NaiveDatetime
+    dropoff_datetime: Optional[NaiveDatetime] = None
+    pickup_longitude: Longitude
+    pickup_latitude: Latitude
+    dropoff_longitude: Longitude
+    dropoff_latitude: Latitude
+    store_and_fwd_flag: int = 0
+
+
+class TripBatch(BaseModel):
+    trips: List[Trip]
+
+
+trip_list_adapter = TypeAdapter(List[Trip])
+
+
+def validation_errors(e):
+    """Compact, JSON-safe error list: where and what, without echoing input."""
+    return [
+        {"loc": list(error["loc"]), "msg": error["msg"], "type": error["type"]}
+        for error in e.errors(include_url=False, include_context=False, include_input=False)
+    ]
@@ -1,20 +1,207 @@
 import os
+import asyncio
+import hashlib
+import hmac
 import pandas as pd
 import numpy as np
 from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+from src.batching import MicroBatcher, QueueFullError, ScoredBatch
+from src.cache import TTLCache
+from src.metrics import Registry, SIZE_BUCKETS
+from src.request_log import RequestLogger
+from src.schemas import Trip, TripBatch, trip_list_adapter, validation_errors
+from src.executor import default_workers, make_executor
+from src.features.geo import geo_features, geo_features_scalar
+from src.features.temporal import epoch_seconds, temporal_features, temporal_features_scalar
+from src.features.zones import ZonePairStats
+from src.models.compiled_forest import CompiledForest
 import joblib
+import logging
+import orjson
 import pathlib
-from datetime import datetime
+import random
+import threading
+import time
+import warnings
+from contextlib import asynccontextmanager
+from typing import Any, NamedTuple
 
 load_dotenv()
 
-model_path = 'models/model.joblib' 
-model = joblib.load(model_path)
+# The hot path hands the model plain float64 arrays laid out in
+# REQUIRED_FEATURES order, so the fit-time column names are not available.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
 
-app = FastAPI()
+model_path = os.getenv("MODEL_PATH", 'models/model.joblib')
+compiled_model_path = os.getenv("COMPILED_MODEL_PATH", 'models/model_compiled')
+
+# Zone-pair trip statistics written by train_model.py. When present, every
+# prediction also reports the historical median duration and average speed
+# for its pickup/dropoff zones at that hour of the week. They are context
+# for the caller only: the model does not see them.
+zone_stats_path = os.getenv("ZONE_STATS_PATH", 'models/zone_stats.npz')
+
+# "compiled" serves the flat-array forest written by train_model.py,
+# "joblib" the pickled scikit-learn estimator, "auto" the compiled one
+# whenever it exists.
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "auto")
+
+# Map the model file read-only instead of copying it into each process, so
+# uvicorn workers and inference processes on one node share its pages. Only
+# the compiled forest benefits; scikit-learn copies tree arrays on unpickle.
+MODEL_MMAP = os.getenv("MODEL_MMAP", "1") == "1"
+
+# Load the model during start-up rather than on the first request.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+
+# A new artifact at the model path is picked up without a restart: polled
+# every MODEL_WATCH_SECONDS (0 turns polling off) or on POST /admin/reload,
+# which requires an X-Admin-Token header matching ADMIN_TOKEN and is
+# refused outright while ADMIN_TOKEN is unset.
+# Replace artifacts with an atomic rename; a half-written file fails to load
+# and the current model keeps serving until the next attempt. Only the served
+# artifact is watched, chosen when the service starts: in "auto" mode with a
+# compiled directory present and in "compiled" mode that is the compiled
+# directory, which train_model.py writes last, after model.joblib and
+# zone_stats.npz, so a new model.joblib on its own is not picked up until it
+# is compiled (src/models/compiled_forest.py).
+MODEL_WATCH_SECONDS = float(os.getenv("MODEL_WATCH_SECONDS", "0"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Repeated trips (airports, stations) at the same time of week are answered
+# from an in-process cache. Coordinates are rounded to
+# PREDICTION_CACHE_PRECISION decimal places (4 is roughly 10 m); a size of 0
+# turns the cache off. The key holds the minute of the week but not the date,
+# although the model also sees pickup_dt (days since the reference epoch): a
+# cached answer can come from the same minute of another week, up to
+# PREDICTION_CACHE_TTL seconds old.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+PREDICTION_CACHE_PRECISION = int(os.getenv("PREDICTION_CACHE_PRECISION", "4"))
+
+prediction_cache = TTLCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+# One JSON line per /predict call and one per /predict/batch call for
+# Filebeat. Handlers only enqueue records; a background thread formats them
+# and appends them in batches of REQUEST_LOG_BUFFER lines, at least every
+# REQUEST_LOG_FLUSH_SECONDS. REQUEST_LOG_SAMPLE_RATE is the fraction of
+# requests logged (errors are always logged), a batch record carries up to
+# REQUEST_LOG_BATCH_SAMPLE of its trips, records arriving at a full queue are
+# dropped, and an empty REQUEST_LOG_PATH turns the log off.
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "logs/trip-duration-api.log")
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "1.0"))
+REQUEST_LOG_QUEUE_SIZE = int(os.getenv("REQUEST_LOG_QUEUE_SIZE", "10000"))
+REQUEST_LOG_BUFFER = int(os.getenv("REQUEST_LOG_BUFFER", "256"))
+REQUEST_LOG_FLUSH_SECONDS = float(os.getenv("REQUEST_LOG_FLUSH_SECONDS", "1.0"))
+REQUEST_LOG_BATCH_SAMPLE = int(os.getenv("REQUEST_LOG_BATCH_SAMPLE", "5"))
+
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "trip_api_stage_seconds",
+    "Time spent in each stage of a request: parse, queue, preprocess, predict, serialize.",
+    ["endpoint", "stage"])
+REQUEST_SECONDS = metrics.histogram(
+    "trip_api_request_seconds", "Time from handler entry to response.", ["endpoint"])
+REQUESTS = metrics.counter(
+    "trip_api_requests_total", "Requests handled, by endpoint and status code.", ["endpoint", "status"])
+IN_FLIGHT = metrics.gauge(
+    "trip_api_requests_in_flight", "Requests currently being handled.", ["endpoint"])
+BATCH_SIZE = metrics.histogram(
+    "trip_api_batch_size", "Trips scored per model call.", ["source"], buckets=SIZE_BUCKETS)
+MODEL_LOAD_SECONDS = metrics.gauge(
+    "trip_api_model_load_seconds", "Time taken by the most recent model load.")
+
+class LoadedModel(NamedTuple):
+    model: Any
+    version: str
+    path: str
+    load_seconds: float
+    loaded_at: float
+    zone_stats: Any = None
+
+# The serving model and its version live in one tuple, so swapping in a
+# reloaded model is a single assignment and readers never see a mix.
+loaded = None
+model_reloads = 0
+_model_lock = threading.Lock()
+
+def model_artifact_path():
+    if MODEL_FORMAT == "compiled" or (MODEL_FORMAT == "auto" and os.path.exists(compiled_model_path)):
+        return compiled_model_path
+    return model_path
+
+def artifact_version(path):
+    # Content hash of the artifact (every file, for a directory), so any
+    # retrained or re-exported model gets a new version.
+    digest = hashlib.sha256()
+    files = sorted(pathlib.Path(path).rglob('*')) if os.path.isdir(path) else [pathlib.Path(path)]
+    for file in files:
+        if file.is_file():
+            digest.update(file.name.encode())
+            digest.update(file.read_bytes())
+    return digest.hexdigest()[:12]
+
+def artifact_signature(path):
+    # Cheap change check for the watcher: sizes and mtimes, no file reads.
+    files = sorted(pathlib.Path(path).rglob('*')) if os.path.isdir(path) else [pathlib.Path(path)]
+    return tuple((file.name, file.stat().st_size, file.stat().st_mtime_ns) for file in files if file.is_file())
+
+def load_model():
+    started = time.perf_counter()
+    mmap_mode = 'r' if MODEL_MMAP else None
+    path = model_artifact_path()
+    if path == compiled_model_path:
+        new_model = CompiledForest.load(path, mmap_mode=mmap_mode)
+    else:
+        new_model = joblib.load(path, mmap_mode=mmap_mode)
+    zone_stats = ZonePairStats.load(zone_stats_path) if os.path.exists(zone_stats_path) else None
+    return LoadedModel(new_model, artifact_version(path), path, time.perf_counter() - started, time.time(),
+                       zone_stats)
+
+def install_model(new):
+    global loaded
+    loaded = new
+    MODEL_LOAD_SECONDS.set(new.load_seconds)
+    # Cache keys carry the version, so this only frees the old entries.
+    prediction_cache.clear()
+
+def get_loaded():
+    if loaded is None:
+        with _model_lock:
+            if loaded is None:
+                install_model(load_model())
+    return loaded
+
+def get_model():
+    return get_loaded().model
+
+def model_version():
+    return loaded.version if loaded is not None else None
+
+@asynccontextmanager
+async def lifespan(app):
+    if MODEL_WARMUP:
+        await asyncio.to_thread(get_model)
+    await warm_executor()
+    request_log.start()
+    watcher = asyncio.create_task(watch_model()) if MODEL_WATCH_SECONDS > 0 else None
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await asyncio.to_thread(request_log.stop)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class FastJSONResponse(JSONResponse):
+    # orjson encodes the small response dicts in about half the time of json.dumps.
+    def render(self, content):
+        return orjson.dumps(content)
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,70 +213,366 @@ app.add_middleware(
 
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 
-def haversine_array(lat1, lng1, lat2, lng2):
-    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
-    AVG_EARTH_RADIUS = 6371
-    lat = lat2 - lat1
-    lng = lng2 - lng1
-    d = np.sin(lat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(lng * 0.5) ** 2
-    h = 2 * AVG_EARTH_RADIUS * np.arcsin(np.sqrt(d))
-    return h
-
-def dummy_manhattan_distance(lat1, lng1, lat2, lng2):
-    a = haversine_array(lat1, lng1, lat1, lng2)
-    b = haversine_array(lat1, lng1, lat2, lng1)
-    return a + b
-
-def bearing_array(lat1, lng1, lat2, lng2):
-    AVG_EARTH_RADIUS = 6371 
-    lng_delta_rad = np.radians(lng2 - lng1)
-    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
-    y = np.sin(lng_delta_rad) * np.cos(lat2)
-    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lng_delta_rad)
-    return np.degrees(np.arctan2(y, x))
+REQUIRED_FEATURES = [
+    'vendor_id', 'passenger_count', 'pickup_longitude', 'pickup_latitude',
+    'dropoff_longitude', 'dropoff_latitude', 'store_and_fwd_flag',
+    'distance_haversine', 'distance_dummy_manhattan', 'direction',
+    'pickup_weekday', 'pickup_hour', 'pickup_minute', 'pickup_dt', 'pickup_week_hour'
+]
+
+# Oversized batches are refused before any trip is validated: by body size
+# (BATCH_MAX_BYTES, by default 1 KiB per allowed trip, several times a
+# typical trip object) and, for NDJSON, by line count.
+BATCH_MAX_TRIPS = int(os.getenv("BATCH_MAX_TRIPS", "50000"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", "0")) or BATCH_MAX_TRIPS * 1024
+
+# Concurrent /predict calls are coalesced into one model call. A window of 0
+# turns the batcher off and scores every request on its own.
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "2"))
+PREDICT_BATCH_MAX_SIZE = int(os.getenv("PREDICT_BATCH_MAX_SIZE", "64"))
+PREDICT_QUEUE_MAX = int(os.getenv("PREDICT_QUEUE_MAX", "0"))
+
+# Where CPU-bound scoring runs: "thread", "process" or "inline" (on the
+# event loop). Defaults to one worker per available core.
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or default_workers()
 
 def preprocess_input(input_data):
-    df = pd.DataFrame([input_data])
-    
-    df['pickup_datetime'] = pd.to_datetime(df['pickup_datetime'])
-    
-    df['pickup_weekday'] = df['pickup_datetime'].dt.weekday
-    df['pickup_hour'] = df['pickup_datetime'].dt.hour
-    df['pickup_minute'] = df['pickup_datetime'].dt.minute
-    
-    base_date = pd.to_datetime('2016-01-01 00:00:00')
-    df['pickup_dt'] = (df['pickup_datetime'] - base_date).dt.total_seconds()
-    df['pickup_week_hour'] = df['pickup_weekday'] * 24 + df['pickup_hour']
+    return preprocess_frame(pd.DataFrame([input_data]))
+
+def preprocess_batch(trips):
+    # One column-oriented frame for the whole batch, so every feature below
+    # is computed once over full arrays instead of once per trip.
+    columns = {name: [trip[name] for trip in trips] for name in trips[0]}
+    return preprocess_frame(pd.DataFrame(columns))
+
+def preprocess_frame(df):
+    for name, values in temporal_features(epoch_seconds(df['pickup_datetime'])).items():
+        df[name] = values
     
-    df['distance_haversine'] = haversine_array(
+    distances = geo_features(
         df['pickup_latitude'].values, 
         df['pickup_longitude'].values, 
         df['dropoff_latitude'].values, 
         df['dropoff_longitude'].values
     )
+    df['distance_haversine'] = distances[0]
+    df['distance_dummy_manhattan'] = distances[1]
+    df['direction'] = distances[2]
     
-    df['distance_dummy_manhattan'] = dummy_manhattan_distance(
-        df['pickup_latitude'].values, 
-        df['pickup_longitude'].values, 
-        df['dropoff_latitude'].values, 
-        df['dropoff_longitude'].values
-    )
+    return df[REQUIRED_FEATURES]
+
+def build_feature_row(trip, out=None):
+    """Fill one float64 row in REQUIRED_FEATURES order straight from a parsed trip.
+
+    Produces exactly the values of preprocess_input without building a
+    DataFrame, using the scalar forms of the shared geo and temporal kernels.
+    """
+    if out is None:
+        out = np.empty(len(REQUIRED_FEATURES), dtype=np.float64)
     
-    df['direction'] = bearing_array(
-        df['pickup_latitude'].values, 
-        df['pickup_longitude'].values, 
-        df['dropoff_latitude'].values, 
-        df['dropoff_longitude'].values
-    )
+    lat1 = trip['pickup_latitude']
+    lng1 = trip['pickup_longitude']
+    lat2 = trip['dropoff_latitude']
+    lng2 = trip['dropoff_longitude']
     
-    required_features = [
-        'vendor_id', 'passenger_count', 'pickup_longitude', 'pickup_latitude',
-        'dropoff_longitude', 'dropoff_latitude', 'store_and_fwd_flag',
-        'distance_haversine', 'distance_dummy_manhattan', 'direction',
-        'pickup_weekday', 'pickup_hour', 'pickup_minute', 'pickup_dt', 'pickup_week_hour'
+    out[0] = trip['vendor_id']
+    out[1] = trip['passenger_count']
+    out[2] = lng1
+    out[3] = lat1
+    out[4] = lng2
+    out[5] = lat2
+    out[6] = trip['store_and_fwd_flag']
+    out[7], out[8], out[9] = geo_features_scalar(lat1, lng1, lat2, lng2)
+    out[10], out[11], out[12], out[13], out[14] = temporal_features_scalar(trip['pickup_datetime'])
+    return out
+
+def build_feature_matrix(trips, out=None):
+    """Row-by-row counterpart of build_feature_row for small batches."""
+    if out is None:
+        out = np.empty((len(trips), len(REQUIRED_FEATURES)), dtype=np.float64)
+    for i, trip in enumerate(trips):
+        build_feature_row(trip, out[i])
+    return out
+
+def logged_features(trip):
+    return dict(zip(REQUIRED_FEATURES, build_feature_row(trip).tolist()))
+
+request_log = RequestLogger(
+    REQUEST_LOG_PATH,
+    sample_rate=REQUEST_LOG_SAMPLE_RATE,
+    queue_size=REQUEST_LOG_QUEUE_SIZE,
+    buffer_size=REQUEST_LOG_BUFFER,
+    flush_interval=REQUEST_LOG_FLUSH_SECONDS,
+    features=logged_features,
+)
+
+SCORING_STAGES = ("preprocess", "predict")
+
+def score_trips(trips):
+    # Stage timings and the version of the model actually used travel back
+    # with the predictions, so both are right even when scoring ran in
+    # another process or raced with a reload.
+    current = get_loaded()
+    started = time.perf_counter()
+    features = build_feature_matrix(trips)
+    built = time.perf_counter()
+    predictions = current.model.predict(features)
+    return ScoredBatch(predictions, {"preprocess": built - started, "predict": time.perf_counter() - built,
+                                     "model_version": current.version})
+
+def score_trips_vectorized(trips, current=None):
+    current = current or get_loaded()
+    started = time.perf_counter()
+    features = preprocess_batch(trips)
+    built = time.perf_counter()
+    predictions = current.model.predict(features)
+    return ScoredBatch(predictions, {"preprocess": built - started, "predict": time.perf_counter() - built,
+                                     "model_version": current.version})
+
+def score_microbatch(trips):
+    # The batcher hands each caller only its own result, so the version
+    # rides along with every prediction.
+    scored = score_trips(trips)
+    version = scored.meta["model_version"]
+    return ScoredBatch([(prediction, version) for prediction in scored.results], scored.meta)
+
+def record_scoring(endpoint, source, batch_size, meta):
+    BATCH_SIZE.labels(source).observe(batch_size)
+    if meta:
+        for stage in SCORING_STAGES:
+            STAGE_SECONDS.labels(endpoint, stage).observe(meta[stage])
+
+def observe_microbatch(batch_size, waits, meta):
+    queue = STAGE_SECONDS.labels("predict", "queue")
+    for waited in waits:
+        queue.observe(waited)
+    record_scoring("predict", "microbatch", batch_size, meta)
+
+def init_worker():
+    # Runs once per pool worker so the first real request doesn't pay for
+    # the model's first call (or, in a spawned process, for loading it).
+    get_model().predict(np.zeros((1, len(REQUIRED_FEATURES))))
+
+executor = None
+batcher = None
+
+def get_executor():
+    global executor
+    if executor is None:
+        executor = make_executor(INFERENCE_EXECUTOR, INFERENCE_WORKERS, initializer=init_worker)
+    return executor
+
+async def warm_executor():
+    pool = get_executor()
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(pool, int) for _ in range(INFERENCE_WORKERS)])
+
+def get_batcher():
+    global batcher
+    if batcher is None and PREDICT_BATCH_WINDOW_MS > 0:
+        pool = get_executor()
+        batcher = MicroBatcher(
+            score_microbatch,
+            max_batch_size=PREDICT_BATCH_MAX_SIZE,
+            max_wait_ms=PREDICT_BATCH_WINDOW_MS,
+            max_queue_size=PREDICT_QUEUE_MAX,
+            executor=pool,
+            max_concurrency=INFERENCE_WORKERS if pool is not None else 1,
+            observer=observe_microbatch,
+        )
+    return batcher
+
+async def run_inference(fn, *args):
+    pool = get_executor()
+    if pool is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+_reload_lock = asyncio.Lock()
+
+async def reload_model(force=False):
+    """Load, warm and swap in the artifact at the model path.
+
+    Requests keep being served by the current model until the new one is
+    ready. Process workers each hold their own copy, so a fresh pool is
+    started and warmed first; the old pool finishes whatever it was given
+    and then shuts down, so no request is dropped.
+    """
+    global executor, model_reloads
+    async with _reload_lock:
+        current = get_loaded()
+        path = model_artifact_path()
+        version = await asyncio.to_thread(artifact_version, path)
+        if version == current.version and path == current.path and not force:
+            return {"reloaded": False, "model_version": current.version}
+
+        new = await asyncio.to_thread(load_model)
+        await asyncio.to_thread(new.model.predict, np.zeros((1, len(REQUIRED_FEATURES))))
+
+        old_pool = None
+        if INFERENCE_EXECUTOR == "process":
+            old_pool = executor
+            pool = make_executor(INFERENCE_EXECUTOR, INFERENCE_WORKERS, initializer=init_worker)
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(pool, int) for _ in range(INFERENCE_WORKERS)])
+            executor = pool
+            if batcher is not None:
+                batcher.executor = pool
+
+        install_model(new)
+        model_reloads += 1
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+        return {"reloaded": True, "model_version": new.version, "previous_version": current.version,
+                "load_seconds": new.load_seconds}
+
+async def watch_model():
+    # The watched path is fixed at start-up. In "auto" mode the compiled
+    # directory is briefly missing while a new one is swapped in, and falling
+    # back to model.joblib then would load it and the new compiled forest
+    # right after: two reloads for one publish.
+    path = model_artifact_path()
+    signature = await asyncio.to_thread(artifact_signature, path)
+    while True:
+        await asyncio.sleep(MODEL_WATCH_SECONDS)
+        try:
+            latest = await asyncio.to_thread(artifact_signature, path)
+            # Empty while an artifact directory is being swapped in; look again next poll.
+            if latest and latest != signature:
+                await reload_model()
+                signature = latest
+        except Exception as e:
+            # Keep serving the current model; a later poll retries.
+            request_log.log("model reload failed", level=logging.ERROR, error=str(e),
+                            error_type=type(e).__name__, model_version=model_version())
+
+def trip_dict(trip):
+    return {
+        "vendor_id": trip.vendor_id,
+        "passenger_count": trip.passenger_count,
+        "pickup_datetime": trip.pickup_datetime,
+        "dropoff_datetime": trip.dropoff_datetime,
+        "pickup_longitude": trip.pickup_longitude,
+        "pickup_latitude": trip.pickup_latitude,
+        "dropoff_longitude": trip.dropoff_longitude,
+        "dropoff_latitude": trip.dropoff_latitude,
+        "store_and_fwd_flag": 0,
+    }
+
+def parse_trip(data):
+    return trip_dict(Trip.model_validate(data))
+
+def parse_trip_json(body):
+    return trip_dict(Trip.model_validate_json(body))
+
+def prediction_cache_key(trip, version):
+    pickup = trip['pickup_datetime']
+    return (
+        round(trip['pickup_latitude'], PREDICTION_CACHE_PRECISION),
+        round(trip['pickup_longitude'], PREDICTION_CACHE_PRECISION),
+        round(trip['dropoff_latitude'], PREDICTION_CACHE_PRECISION),
+        round(trip['dropoff_longitude'], PREDICTION_CACHE_PRECISION),
+        trip['vendor_id'],
+        trip['passenger_count'],
+        pickup.weekday() * 24 + pickup.hour,
+        pickup.minute,
+        version,
+    )
+
+def format_prediction(prediction, version):
+    prediction_seconds = int(round(prediction))
+    minutes = prediction_seconds // 60
+    seconds = prediction_seconds % 60
+    return {
+        "prediction": prediction_seconds,
+        "formatted_time": f"{minutes} minutes and {seconds} seconds",
+        "model_version": version
+    }
+
+def zone_summary(trip, stats):
+    grid = stats.grid
+    pickup_zone = grid.zone_of_one(trip['pickup_latitude'], trip['pickup_longitude'])
+    dropoff_zone = grid.zone_of_one(trip['dropoff_latitude'], trip['dropoff_longitude'])
+    week_hour = temporal_features_scalar(trip['pickup_datetime'])[4]
+    return {"pickup_zone": pickup_zone, "dropoff_zone": dropoff_zone,
+            **stats.lookup_one(pickup_zone, dropoff_zone, week_hour)}
+
+def zone_summaries(trips, stats):
+    columns = {name: np.array([trip[name] for trip in trips]) for name in
+               ('pickup_latitude', 'pickup_longitude', 'dropoff_latitude', 'dropoff_longitude')}
+    pickup = stats.grid.zone_of(columns['pickup_latitude'], columns['pickup_longitude'])
+    dropoff = stats.grid.zone_of(columns['dropoff_latitude'], columns['dropoff_longitude'])
+    seconds = epoch_seconds([trip['pickup_datetime'] for trip in trips])
+    found = stats.lookup(pickup, dropoff, temporal_features(seconds)['pickup_week_hour'])
+    return [
+        {"pickup_zone": p, "dropoff_zone": d, "trips": n, "median_duration": m, "avg_speed_kmh": s, "level": l}
+        for p, d, n, m, s, l in zip(pickup.tolist(), dropoff.tolist(), found['trips'].tolist(),
+                                    found['median_duration'].tolist(), found['avg_speed_kmh'].tolist(),
+                                    found['level'].tolist())
     ]
-    
-    return df[required_features]
+
+class BatchTooLarge(Exception):
+    pass
+
+async def read_batch_body(request):
+    # Content-Length is checked before anything is read; a chunked body is
+    # read only up to the cap.
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > BATCH_MAX_BYTES:
+        raise BatchTooLarge(f"body of {declared} bytes exceeds BATCH_MAX_BYTES={BATCH_MAX_BYTES}")
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > BATCH_MAX_BYTES:
+            raise BatchTooLarge(f"body exceeds BATCH_MAX_BYTES={BATCH_MAX_BYTES}")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def parse_batch_body(body, content_type):
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        lines = [line for line in body.splitlines() if line.strip()]
+        if len(lines) > BATCH_MAX_TRIPS:
+            raise BatchTooLarge(f"batch of {len(lines)} trips exceeds BATCH_MAX_TRIPS={BATCH_MAX_TRIPS}")
+        # Validated as one array so errors are located by trip index.
+        body = b"[" + b",".join(lines) + b"]"
+    if body.lstrip()[:1] == b"{":
+        trips = [trip_dict(trip) for trip in TripBatch.model_validate_json(body).trips]
+    else:
+        trips = [trip_dict(trip) for trip in trip_list_adapter.validate_json(body)]
+    if len(trips) > BATCH_MAX_TRIPS:
+        raise BatchTooLarge(f"batch of {len(trips)} trips exceeds BATCH_MAX_TRIPS={BATCH_MAX_TRIPS}")
+    return trips
+
+def collect_runtime_metrics():
+    cache = prediction_cache.stats()
+    yield ("trip_api_cache_hits_total", "counter", "Prediction cache hits.", cache["hits"])
+    yield ("trip_api_cache_misses_total", "counter", "Prediction cache misses.", cache["misses"])
+    yield ("trip_api_cache_evictions_total", "counter", "Prediction cache LRU evictions.", cache["evictions"])
+    yield ("trip_api_cache_entries", "gauge", "Entries currently in the prediction cache.", cache["size"])
+    if batcher is not None:
+        queued = batcher.stats()
+        yield ("trip_api_batcher_queue_depth", "gauge", "Trips waiting for a micro-batch.", queued["queue_depth"])
+        yield ("trip_api_batcher_rejected_total", "counter", "Trips rejected by a full queue.", queued["rejected"])
+    yield ("trip_api_request_log_dropped_total", "counter", "Request log records dropped at a full queue.",
+           request_log.handler.dropped)
+
+metrics.add_collector(collect_runtime_metrics)
+
+def invalid_request(e):
+    return FastJSONResponse(status_code=422, content={"error": "invalid request", "detail": validation_errors(e)})
+
+def error_response(e):
+    import traceback
+    return FastJSONResponse(
+        status_code=500, 
+        content={
+            "error": str(e),
+            "traceback": traceback.format_exc()
+        }
+    )
 
 @app.get("/", response_class=FileResponse)
 async def serve_ui():
@@ -100,48 +583,186 @@ async def serve_ui():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "model_loaded": loaded is not None, "model_version": model_version()}
+
+@app.get("/stats")
+def stats():
+    return {
+        "model": {
+            "loaded": loaded is not None,
+            "version": model_version(),
+            "path": loaded.path if loaded is not None else None,
+            "load_seconds": loaded.load_seconds if loaded is not None else None,
+            "loaded_at": loaded.loaded_at if loaded is not None else None,
+            "reloads": model_reloads,
+        },
+        "executor": {"kind": INFERENCE_EXECUTOR, "workers": INFERENCE_WORKERS},
+        "cache": prediction_cache.stats(),
+        "batcher": batcher.stats() if batcher is not None else None,
+        "request_log": request_log.stats()
+    }
+
+@app.post("/admin/reload")
+async def admin_reload(request: Request):
+    if not ADMIN_TOKEN:
+        return FastJSONResponse(status_code=403, content={"error": "admin endpoints are disabled: ADMIN_TOKEN is not set"})
+    if not hmac.compare_digest(request.headers.get("x-admin-token", "").encode(), ADMIN_TOKEN.encode()):
+        return FastJSONResponse(status_code=403, content={"error": "invalid admin token"})
+    try:
+        return await reload_model(force=request.query_params.get("force") == "1")
+    except Exception as e:
+        return error_response(e)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/predict")
 async def predict(request: Request):
+    started = time.perf_counter()
+    with IN_FLIGHT.labels("predict").track_inprogress():
+        response = await _predict(request)
+    REQUESTS.labels("predict", str(response.status_code)).inc()
+    REQUEST_SECONDS.labels("predict").observe(time.perf_counter() - started)
+    return response
+
+async def predict_uncached(input_dict, timings):
+    stage_started = time.perf_counter()
+    coalescer = get_batcher()
+    if coalescer is not None:
+        prediction, version = await coalescer.submit(input_dict)
+    else:
+        scored = await run_inference(score_trips, [input_dict])
+        record_scoring("predict", "single", 1, scored.meta)
+        timings.update((stage, scored.meta[stage]) for stage in SCORING_STAGES)
+        prediction, version = scored.results[0], scored.meta["model_version"]
+    timings["inference"] = time.perf_counter() - stage_started
+    result = format_prediction(prediction, version)
+    current = get_loaded()
+    if current.zone_stats is not None:
+        result["zone"] = zone_summary(input_dict, current.zone_stats)
+    # A reload can land while the trip is scored. Only a result whose
+    # prediction and zone stats come from one model is cached, under the
+    # version that produced it.
+    if prediction_cache.maxsize and current.version == version:
+        prediction_cache.set(prediction_cache_key(input_dict, version), result)
+    return result
+
+async def _predict(request):
+    timings = {}
+    input_dict = None
     try:
-        data = await request.json()
+        stage_started = time.perf_counter()
+        input_dict = parse_trip_json(await request.body())
+        timings["parse"] = time.perf_counter() - stage_started
+        STAGE_SECONDS.labels("predict", "parse").observe(timings["parse"])
         
-        input_dict = {
-            "vendor_id": int(data.get("vendor_id", 1)),
-            "passenger_count": int(data.get("passenger_count", 1)),
-            "pickup_datetime": data.get("pickup_datetime"),
-            "dropoff_datetime": data.get("dropoff_datetime"), 
-            "pickup_longitude": float(data.get("pickup_longitude")),
-            "pickup_latitude": float(data.get("pickup_latitude")),
-            "dropoff_longitude": float(data.get("dropoff_longitude")),
-            "dropoff_latitude": float(data.get("dropoff_latitude")),
-            "store_and_fwd_flag": 0,  
-            "trip_duration": 0  
-        }
+        snapshot = loaded
+        cache_key = None
+        if prediction_cache.maxsize and snapshot is not None:
+            cache_key = prediction_cache_key(input_dict, snapshot.version)
+        result = prediction_cache.get(cache_key) if cache_key else None
+        cached = result is not None
+        if result is None:
+            result = await predict_uncached(input_dict, timings)
+        
+        stage_started = time.perf_counter()
+        response = FastJSONResponse(content=result)
+        timings["serialize"] = time.perf_counter() - stage_started
+        STAGE_SECONDS.labels("predict", "serialize").observe(timings["serialize"])
         
-        if input_dict['pickup_datetime'] and 'T' in input_dict['pickup_datetime']:
-            input_dict['pickup_datetime'] = input_dict['pickup_datetime'].replace('T', ' ')
+        if request_log.sample():
+            request_log.log("prediction", endpoint="predict", trip=input_dict,
+                            prediction=result["prediction"], cached=cached,
+                            model_version=result["model_version"], timings=timings)
+        return response
+        
+    except ValidationError as e:
+        log_error("predict", e, input_dict, timings)
+        return invalid_request(e)
+    except QueueFullError as e:
+        log_error("predict", e, input_dict, timings)
+        return FastJSONResponse(status_code=503, content={"error": str(e)})
+    except Exception as e:
+        log_error("predict", e, input_dict, timings)
+        return error_response(e)
+
+def log_error(endpoint, e, trip, timings):
+    request_log.log("error", level=logging.ERROR, endpoint=endpoint, trip=trip,
+                    error=str(e), error_type=type(e).__name__,
+                    model_version=model_version(), timings=timings)
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """Score many trips with one feature pass and one model call.
+
+    Accepts a JSON array of trips, an object with a "trips" array, or
+    NDJSON (one trip per line, Content-Type application/x-ndjson).
+    """
+    started = time.perf_counter()
+    with IN_FLIGHT.labels("predict_batch").track_inprogress():
+        response = await _predict_batch(request)
+    REQUESTS.labels("predict_batch", str(response.status_code)).inc()
+    REQUEST_SECONDS.labels("predict_batch").observe(time.perf_counter() - started)
+    return response
+
+def log_batch(trips, predictions, version, timings, seconds):
+    # One record per batch: a record per trip would be built on the event
+    # loop and overflow the log queue on large batches.
+    picked = sorted(random.sample(range(len(trips)), min(REQUEST_LOG_BATCH_SAMPLE, len(trips))))
+    request_log.log("batch prediction", endpoint="predict_batch", batch_size=len(trips),
+                    model_version=version, seconds=seconds, timings=timings,
+                    sample=[{"index": i, "trip": trips[i], "prediction": predictions[i]["prediction"]}
+                            for i in picked])
+
+async def _predict_batch(request):
+    started = time.perf_counter()
+    timings = {}
+    try:
+        stage_started = time.perf_counter()
+        body = await read_batch_body(request)
+        trips = parse_batch_body(body, request.headers.get("content-type", ""))
         
-        df_features = preprocess_input(input_dict)
+        if not trips:
+            return FastJSONResponse(content={"count": 0, "model_version": model_version(), "predictions": []})
         
-        prediction = model.predict(df_features)[0]
+        timings["parse"] = time.perf_counter() - stage_started
+        STAGE_SECONDS.labels("predict_batch", "parse").observe(timings["parse"])
         
-        prediction_seconds = int(round(prediction))
-        minutes = prediction_seconds // 60
-        seconds = prediction_seconds % 60
+        # One model snapshot serves the whole request, so the zone stats
+        # match model_version even if a reload lands meanwhile. Process
+        # workers hold their own copy; a reload swaps their pool and the
+        # loaded model together, with no await in between.
+        current = get_loaded()
+        scored = await run_inference(score_trips_vectorized, trips,
+                                     None if INFERENCE_EXECUTOR == "process" else current)
+        record_scoring("predict_batch", "batch_endpoint", len(trips), scored.meta)
+        timings.update((stage, scored.meta[stage]) for stage in SCORING_STAGES)
+        version = scored.meta["model_version"]
         
-        return JSONResponse(content={
-            "prediction": prediction_seconds,
-            "formatted_time": f"{minutes} minutes and {seconds} seconds"
+        stage_started = time.perf_counter()
+        predictions = [format_prediction(p, version) for p in scored.results]
+        if current.zone_stats is not None:
+            for prediction, zone in zip(predictions, zone_summaries(trips, current.zone_stats)):
+                prediction["zone"] = zone
+        response = FastJSONResponse(content={
+            "count": len(trips),
+            "model_version": version,
+            "predictions": predictions
         })
+        timings["serialize"] = time.perf_counter() - stage_started
+        STAGE_SECONDS.labels("predict_batch", "serialize").observe(timings["serialize"])
+        
+        if request_log.sample():
+            log_batch(trips, predictions, version, timings, time.perf_counter() - started)
+        return response
         
+    except BatchTooLarge as e:
+        log_error("predict_batch", e, None, timings)
+        return FastJSONResponse(status_code=413, content={"error": str(e)})
+    except ValidationError as e:
+        log_error("predict_batch", e, None, timings)
+        return invalid_request(e)
     except Exception as e:
-        import traceback
-        return JSONResponse(
-            status_code=500, 
-            content={
-                "error": str(e),
-                "traceback": traceback.format_exc()
-            }
-        )
\ No newline at end of file
+        log_error("predict_batch", e, None, timings)
+        return error_response(e)
@@ -5,7 +5,9 @@ import requests
 import json
 import os
 import sys
+import tempfile
 from datetime import datetime
+from unittest import mock
 
 # Add project root to path for imports if needed
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -83,7 +85,7 @@ class TestTripDurationAPI(unittest.TestCase):
         )
         
         # Should return an error
-        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.status_code, 422)
         data = response.json()
         self.assertIn("error", data)
 
@@ -99,7 +101,7 @@ class TestTripDurationAPI(unittest.TestCase):
         )
         
         # Should return an error
-        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.status_code, 422)
         data = response.json()
         self.assertIn("error", data)
 
@@ -125,6 +127,24 @@ class TestTripDurationAPI(unittest.TestCase):
         # Prediction should be a positive number
         self.assertTrue(data["prediction"] > 0)
 
+    def test_prediction_with_non_finite_coordinates(self):
+        """Test that NaN, infinite and off-globe coordinates are rejected"""
+        for field, value in [("pickup_latitude", "nan"), ("dropoff_longitude", "inf"),
+                             ("pickup_longitude", "-Infinity"), ("dropoff_latitude", 95.0)]:
+            invalid_data = self.sample_data.copy()
+            invalid_data[field] = value
+            response = requests.post(f"{API_URL}/predict", json=invalid_data)
+            self.assertEqual(response.status_code, 422, (field, value))
+            self.assertIn("error", response.json())
+
+    def test_batch_prediction_with_non_finite_coordinates(self):
+        """Test that a NaN coordinate fails the batch instead of being scored"""
+        invalid_data = self.sample_data.copy()
+        invalid_data["pickup_latitude"] = "nan"
+        response = requests.post(f"{API_URL}/predict/batch", json=[self.sample_data, invalid_data])
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("error", response.json())
+
     def test_prediction_with_optional_fields(self):
         """Test prediction with optional fields included"""
         # Add dropoff_datetime
@@ -141,6 +161,26 @@ class TestTripDurationAPI(unittest.TestCase):
         data = response.json()
         self.assertIn("prediction", data)
 
+    def test_prediction_reports_model_version(self):
+        """Test that predictions carry the version of the model that made them"""
+        health = requests.get(f"{API_URL}/health").json()
+        single = requests.post(f"{API_URL}/predict", json=self.sample_data).json()
+        batch = requests.post(f"{API_URL}/predict/batch", json=[self.sample_data]).json()
+        
+        self.assertEqual(single["model_version"], health["model_version"])
+        self.assertEqual(batch["model_version"], health["model_version"])
+        self.assertEqual(batch["predictions"][0]["model_version"], health["model_version"])
+
+    def test_reload_requires_admin_token(self):
+        """Test that the reload endpoint refuses requests without a valid token"""
+        response = requests.post(f"{API_URL}/admin/reload", params={"force": "1"})
+        self.assertEqual(response.status_code, 403)
+        
+        response = requests.post(f"{API_URL}/admin/reload", params={"force": "1"},
+                                 headers={"X-Admin-Token": "not-the-token"})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("error", response.json())
+
     def test_prediction_batch(self):
         """Test multiple predictions to check consistency"""
         results = []
@@ -157,6 +197,52 @@ class TestTripDurationAPI(unittest.TestCase):
         # All predictions should be identical (deterministic model)
         self.assertEqual(len(set(results)), 1, "Predictions should be consistent for identical inputs")
 
+    def test_batch_prediction_matches_single(self):
+        """Test that the batch endpoint agrees with one-at-a-time predictions"""
+        extreme_data = self.sample_data.copy()
+        extreme_data["pickup_longitude"] = -74.05
+        extreme_data["dropoff_latitude"] = 40.65
+        trips = [self.sample_data, extreme_data]
+        
+        response = requests.post(f"{API_URL}/predict/batch", json=trips)
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        
+        for trip, result in zip(trips, data["predictions"]):
+            single = requests.post(f"{API_URL}/predict", json=trip).json()
+            self.assertEqual(result["prediction"], single["prediction"])
+            self.assertEqual(result["formatted_time"], single["formatted_time"])
+
+    def test_batch_prediction_ndjson(self):
+        """Test the batch endpoint with newline-delimited JSON input"""
+        body = "\n".join(json.dumps(self.sample_data) for _ in range(3))
+        
+        response = requests.post(
+            f"{API_URL}/predict/batch",
+            data=body,
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(len({p["prediction"] for p in data["predictions"]}), 1)
+
+    def test_batch_prediction_with_invalid_trip(self):
+        """Test that one malformed trip fails the whole batch"""
+        invalid_data = self.sample_data.copy()
+        invalid_data["passenger_count"] = "not_a_number"
+        
+        response = requests.post(
+            f"{API_URL}/predict/batch",
+            json=[self.sample_data, invalid_data]
+        )
+        
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("error", response.json())
+
     def test_frontend_serving(self):
         """Test if the frontend is being served correctly"""
         response = requests.get(API_URL)
@@ -168,5 +254,141 @@ class TestTripDurationAPI(unittest.TestCase):
         self.assertIn("trip duration predictor", response.text.lower())
 
 
+class TestBatchLimits(unittest.TestCase):
+    """Oversized batches are refused before any trip is validated"""
+
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        from src import service
+        self.service = service
+        self.client = TestClient(service.app)
+        with open(os.path.join(os.path.dirname(__file__), 'sample_request.json')) as f:
+            self.trip = json.load(f)
+        self.saved = (service.BATCH_MAX_TRIPS, service.BATCH_MAX_BYTES)
+        service.BATCH_MAX_TRIPS = 3
+        service.BATCH_MAX_BYTES = 3 * 1024
+
+    def tearDown(self):
+        self.service.BATCH_MAX_TRIPS, self.service.BATCH_MAX_BYTES = self.saved
+
+    def test_body_over_byte_cap_is_not_parsed(self):
+        with mock.patch.object(self.service, "trip_list_adapter") as adapter:
+            response = self.client.post("/predict/batch", json=[self.trip] * 20)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("BATCH_MAX_BYTES", response.json()["error"])
+        adapter.validate_json.assert_not_called()
+
+    def test_ndjson_over_trip_cap_is_not_validated(self):
+        body = "\n".join(json.dumps(self.trip) for _ in range(4))
+        with mock.patch.object(self.service, "trip_list_adapter") as adapter:
+            response = self.client.post("/predict/batch", content=body,
+                                        headers={"Content-Type": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("BATCH_MAX_TRIPS", response.json()["error"])
+        adapter.validate_json.assert_not_called()
+
+    def test_json_array_over_trip_cap(self):
+        self.service.BATCH_MAX_BYTES = 64 * 1024
+        response = self.client.post("/predict/batch", json=[self.trip] * 4)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("BATCH_MAX_TRIPS", response.json()["error"])
+
+
+class ConstantModel:
+    def predict(self, X):
+        return [600.0] * len(X)
+
+
+class TestBatchLogging(unittest.TestCase):
+    """A batch is logged as one record, not one per trip"""
+
+    def setUp(self):
+        from fastapi.testclient import TestClient
+        from src import service
+        from src.request_log import RequestLogger
+        self.service = service
+        self.client = TestClient(service.app)
+        with open(os.path.join(os.path.dirname(__file__), 'sample_request.json')) as f:
+            self.trip = json.load(f)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "api.log")
+        self.saved = (service.request_log, service.loaded, service.INFERENCE_EXECUTOR, service.executor)
+        service.request_log = RequestLogger(self.path, name="test.api.batch_log")
+        service.loaded = service.LoadedModel(ConstantModel(), "test", "test", 0.0, 0.0)
+        service.INFERENCE_EXECUTOR = "inline"
+        service.executor = None
+        service.request_log.start()
+
+    def tearDown(self):
+        self.service.request_log.stop()
+        (self.service.request_log, self.service.loaded, self.service.INFERENCE_EXECUTOR,
+         self.service.executor) = self.saved
+        self.tmp.cleanup()
+
+    def test_one_record_with_a_sample_of_trips(self):
+        response = self.client.post("/predict/batch", json=[self.trip] * 50)
+        self.assertEqual(response.status_code, 200)
+        self.service.request_log.stop()
+        with open(self.path) as f:
+            [record] = [json.loads(line) for line in f]
+        self.assertEqual(record["message"], "batch prediction")
+        self.assertEqual(record["batch_size"], 50)
+        self.assertEqual(record["model_version"], "test")
+        self.assertEqual(len(record["sample"]), self.service.REQUEST_LOG_BATCH_SAMPLE)
+        self.assertEqual(record["sample"][0]["prediction"], 600)
+        self.assertIn("predict", record["timings"])
+
+
+class ReloadingModel(ConstantModel):
+    """Swaps in another model while it is scoring, like a hot reload would"""
+
+    def __init__(self, service, replacement):
+        self.service = service
+        self.replacement = replacement
+
+    def predict(self, X):
+        self.service.loaded = self.replacement
+        return super().predict(X)
+
+
+class TestBatchModelSnapshot(unittest.TestCase):
+    """A batch response takes its zone stats from the model that scored it"""
+
+    def setUp(self):
+        import numpy as np
+        import pandas as pd
+        from fastapi.testclient import TestClient
+        from src import service
+        from src.features.zones import ZoneGrid, ZonePairStats
+        self.service = service
+        self.client = TestClient(service.app)
+        with open(os.path.join(os.path.dirname(__file__), 'sample_request.json')) as f:
+            self.trip = json.load(f)
+        rng = np.random.default_rng(0)
+        frame = pd.DataFrame({
+            'pickup_latitude': rng.uniform(40.70, 40.80, 200), 'pickup_longitude': rng.uniform(-74.0, -73.9, 200),
+            'dropoff_latitude': rng.uniform(40.70, 40.80, 200), 'dropoff_longitude': rng.uniform(-74.0, -73.9, 200),
+            'pickup_week_hour': rng.integers(0, 168, 200), 'distance_haversine': rng.uniform(1, 5, 200),
+            'trip_duration': rng.integers(300, 1800, 200),
+        })
+        self.zone_stats = ZonePairStats.build(frame, ZoneGrid(0.05), min_trips=1)
+        self.saved = (service.loaded, service.INFERENCE_EXECUTOR, service.executor)
+        service.INFERENCE_EXECUTOR = "inline"
+        service.executor = None
+
+    def tearDown(self):
+        self.service.loaded, self.service.INFERENCE_EXECUTOR, self.service.executor = self.saved
+
+    def test_reload_during_scoring_keeps_one_snapshot(self):
+        service = self.service
+        new = service.LoadedModel(ConstantModel(), "new", "new", 0.0, 0.0, self.zone_stats)
+        service.loaded = service.LoadedModel(ReloadingModel(service, new), "old", "old", 0.0, 0.0)
+        data = self.client.post("/predict/batch", json=[self.trip] * 3).json()
+        self.assertEqual(data["model_version"], "old")
+        # The old model had no zone stats, so none are attached
+        self.assertTrue(all("zone" not in p for p in data["predictions"]))
+        self.assertIs(service.loaded, new)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
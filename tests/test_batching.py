@@ -0,0 +1,67 @@
+# tests/test_batching.py
+
+import unittest
+import asyncio
+import os
+import sys
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batching import MicroBatcher, QueueFullError
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the /predict request coalescer"""
+
+    async def test_concurrent_submits_share_one_call(self):
+        calls = []
+
+        def score(items):
+            calls.append(list(items))
+            return [item * 10 for item in items]
+
+        batcher = MicroBatcher(score, max_batch_size=64, max_wait_ms=20)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(8)])
+
+        self.assertEqual(results, [i * 10 for i in range(8)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(batcher.stats()["max_batch_seen"], 8)
+
+    async def test_batches_are_capped_at_max_size(self):
+        batcher = MicroBatcher(lambda items: list(items), max_batch_size=3, max_wait_ms=20)
+        results = await asyncio.gather(*[batcher.submit(i) for i in range(7)])
+
+        self.assertEqual(results, list(range(7)))
+        self.assertEqual(batcher.stats()["batches"], 3)
+
+    async def test_bad_item_only_fails_its_own_caller(self):
+        def score(items):
+            if "bad" in items:
+                raise ValueError("bad item")
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher(score, max_wait_ms=20)
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("bad"), batcher.submit("b"),
+            return_exceptions=True
+        )
+
+        self.assertEqual(results[0], "A")
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], "B")
+        self.assertEqual(batcher.stats()["failed_batches"], 1)
+
+    async def test_full_queue_rejects(self):
+        batcher = MicroBatcher(lambda items: list(items), max_wait_ms=20, max_queue_size=1)
+        results = await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], QueueFullError)
+        self.assertEqual(batcher.stats()["rejected"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
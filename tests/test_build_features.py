@@ -0,0 +1,193 @@
+# tests/test_build_features.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'features')))
+
+from build_features import (FEATURE_CODE, FEATURE_DTYPES, build_chunk, feature_code_version, holdout_mask, partition_key,
+                            raw_partitions, save_data, stream_feature_build)
+
+
+def raw_trips(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pickup = pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 182 * 86400, n), unit='s')
+    return pd.DataFrame({
+        'id': [f'id{i:07d}' for i in range(n)],
+        'vendor_id': rng.integers(1, 3, n),
+        'pickup_datetime': pickup.strftime('%Y-%m-%d %H:%M:%S'),
+        'dropoff_datetime': pickup.strftime('%Y-%m-%d %H:%M:%S'),
+        'passenger_count': rng.integers(1, 7, n),
+        'pickup_longitude': rng.uniform(-74.05, -73.75, n),
+        'pickup_latitude': rng.uniform(40.60, 40.90, n),
+        'dropoff_longitude': rng.uniform(-74.05, -73.75, n),
+        'dropoff_latitude': rng.uniform(40.60, 40.90, n),
+        'store_and_fwd_flag': 'N',
+        'trip_duration': rng.integers(60, 3600, n),
+    })
+
+
+class TestFeatureCache(unittest.TestCase):
+    """Per-chunk feature cache keyed on raw bytes and feature code"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'train.csv')
+        self.cache = os.path.join(self.tmp.name, 'cache')
+        raw_trips(1000).to_csv(self.raw, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, name):
+        output = os.path.join(self.tmp.name, name)
+        rows, _ = stream_feature_build(self.raw, output, 300, 1, 'parquet', self.cache)
+        self.assertEqual(rows, 1000)
+        return pd.read_parquet(output)
+
+    def test_partitions_cover_every_line(self):
+        partitions = list(raw_partitions(self.raw, 300))
+        self.assertEqual(len(partitions), 4)
+        self.assertEqual(sum(body.count(b'\n') for _, body in partitions), 1000)
+
+    def test_rebuild_reads_cache(self):
+        first = self.build('first.parquet')
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+        pd.testing.assert_frame_equal(self.build('second.parquet'), first)
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+
+    def test_changed_partition_is_rebuilt(self):
+        self.build('first.parquet')
+        with open(self.raw) as f:
+            lines = f.readlines()
+        fields = lines[651].split(',')
+        fields[4] = '9'
+        lines[651] = ','.join(fields)
+        with open(self.raw, 'w') as f:
+            f.writelines(lines)
+        rebuilt = self.build('second.parquet')
+        self.assertEqual(len(os.listdir(self.cache)), 5)
+        self.assertEqual(rebuilt.loc[650, 'passenger_count'], 9)
+
+    def test_entries_from_other_code_are_evicted(self):
+        self.build('first.parquet')
+        stale = [os.path.join(self.cache, name) for name in ('0123456789abcdef-key.parquet',
+                                                             'old-key.parquet.123.tmp')]
+        for path in stale:
+            open(path, 'w').close()
+        self.build('second.parquet')
+        self.assertEqual(len(os.listdir(self.cache)), 4)
+        self.assertTrue(all(name.startswith(feature_code_version()) for name in os.listdir(self.cache)))
+
+    def test_build_script_is_feature_code(self):
+        self.assertIn('build_features.py', FEATURE_CODE)
+
+    def test_key_depends_on_code_version_and_format(self):
+        header, body = next(raw_partitions(self.raw, 300))
+        key = partition_key(header, body, feature_code_version(), 'parquet')
+        self.assertNotEqual(key, partition_key(header, body, 'other', 'parquet'))
+        self.assertNotEqual(key, partition_key(header, body, feature_code_version(), 'csv'))
+
+
+class TestStreamingBuild(unittest.TestCase):
+    """Chunked, multi-process builds give the same rows as one in-memory pass"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'train.csv')
+        raw_trips(1000).to_csv(self.raw, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_whole_file_build(self):
+        expected = build_chunk(pd.read_csv(self.raw), 'csv').drop(columns='id')
+        output = os.path.join(self.tmp.name, 'train_features.csv')
+        # Chunks of 300 leave a short last chunk; two workers finish out of order.
+        rows, names = stream_feature_build(self.raw, output, 300, 2, 'csv')
+        self.assertEqual(rows, 1000)
+        self.assertEqual(names, list(expected.columns))
+        pd.testing.assert_frame_equal(pd.read_csv(output), expected.reset_index(drop=True), check_dtype=False)
+
+    def test_single_worker_and_chunk_larger_than_input(self):
+        output = os.path.join(self.tmp.name, 'train_features.csv')
+        rows, _ = stream_feature_build(self.raw, output, 5000, 1, 'csv')
+        self.assertEqual((rows, len(pd.read_csv(output))), (1000, 1000))
+
+
+class TestParquetOutput(unittest.TestCase):
+    """Processed features are stored as Parquet with compact types"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'train.csv')
+        raw_trips(1000).to_csv(self.raw, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_saved_with_compact_dtypes(self):
+        train = build_chunk(pd.read_csv(self.raw), 'csv').drop(columns='id')
+        save_data(train, train.iloc[:10], self.tmp.name, 'parquet')
+        saved = pd.read_parquet(os.path.join(self.tmp.name, 'train.parquet'))
+        for column, dtype in FEATURE_DTYPES.items():
+            self.assertEqual(str(saved[column].dtype), dtype, column)
+        # float32 storage keeps the values the model sees
+        np.testing.assert_allclose(saved['distance_haversine'], train['distance_haversine'], rtol=1e-6)
+        self.assertEqual(len(pd.read_parquet(os.path.join(self.tmp.name, 'test.parquet'))), 10)
+
+    def test_csv_format_is_still_available(self):
+        train = build_chunk(pd.read_csv(self.raw), 'csv').drop(columns='id')
+        save_data(train, train, self.tmp.name, 'csv')
+        self.assertEqual(len(pd.read_csv(os.path.join(self.tmp.name, 'train.csv'))), 1000)
+
+    def test_streamed_parquet_has_a_row_group_per_chunk(self):
+        output = os.path.join(self.tmp.name, 'train.parquet')
+        stream_feature_build(self.raw, output, 300, 1, 'parquet')
+        self.assertEqual(pq.ParquetFile(output).num_row_groups, 4)
+        self.assertEqual(str(pd.read_parquet(output)['pickup_week_hour'].dtype), 'int16')
+
+
+class TestHoldout(unittest.TestCase):
+    """The processed test split is a holdout of the labelled train rows"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'train.csv')
+        self.trips = raw_trips(1000)
+        self.trips.to_csv(self.raw, index=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_mask_is_stable_and_sized(self):
+        mask = holdout_mask(self.trips['id'], 0.2, 2023)
+        np.testing.assert_array_equal(mask, holdout_mask(self.trips['id'][::-1], 0.2, 2023)[::-1])
+        self.assertAlmostEqual(mask.mean(), 0.2, delta=0.05)
+        self.assertFalse((mask == holdout_mask(self.trips['id'], 0.2, 7)).all())
+
+    def test_streamed_holdout_is_disjoint_from_train(self):
+        train_file = os.path.join(self.tmp.name, 'train.parquet')
+        test_file = os.path.join(self.tmp.name, 'test.parquet')
+        rows, names = stream_feature_build(self.raw, train_file, 300, 1, 'parquet', None, (test_file, 0.2, 2023))
+        train, test = pd.read_parquet(train_file), pd.read_parquet(test_file)
+        mask = holdout_mask(self.trips['id'], 0.2, 2023)
+        self.assertEqual(rows, 1000)
+        self.assertNotIn('id', names)
+        self.assertNotIn('id', train.columns)
+        self.assertEqual((len(train), len(test)), ((~mask).sum(), mask.sum()))
+        # Held-out trips are exactly the masked ones, in input order
+        np.testing.assert_allclose(test['pickup_latitude'], self.trips['pickup_latitude'][mask], rtol=1e-6)
+        np.testing.assert_allclose(train['pickup_latitude'], self.trips['pickup_latitude'][~mask], rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
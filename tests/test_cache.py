@@ -0,0 +1,156 @@
+# tests/test_cache.py
+
+import unittest
+import os
+import sys
+import time
+from datetime import datetime
+from unittest import mock
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import service
+from src.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test cases for the prediction cache"""
+
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_clear_invalidates_everything(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("a", 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_zero_size_disables_cache(self):
+        cache = TTLCache(maxsize=0, ttl=60)
+        cache.set("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+class FixedModel:
+    """Predicts the same duration for every trip"""
+
+    def __init__(self, seconds, on_predict=None):
+        self.seconds = seconds
+        self.on_predict = on_predict
+
+    def predict(self, X):
+        if self.on_predict is not None:
+            self.on_predict()
+        return np.full(len(X), self.seconds)
+
+
+def fixed_model(version, seconds=600.0, on_predict=None):
+    return service.LoadedModel(FixedModel(seconds, on_predict), version, version, 0.0, 0.0)
+
+
+class TestPredictionCache(unittest.TestCase):
+    """How the service keys, fills and empties the prediction cache"""
+
+    def setUp(self):
+        self.saved = (service.loaded, service.prediction_cache, service.PREDICTION_CACHE_PRECISION,
+                      service.PREDICT_BATCH_WINDOW_MS, service.INFERENCE_EXECUTOR, service.executor,
+                      service.batcher, service.ADMIN_TOKEN)
+        service.prediction_cache = TTLCache(maxsize=100, ttl=60)
+        service.PREDICTION_CACHE_PRECISION = 3
+        service.PREDICT_BATCH_WINDOW_MS = 0
+        service.INFERENCE_EXECUTOR = "inline"
+        service.executor = service.batcher = None
+        service.loaded = fixed_model("v1")
+        self.request = {
+            "vendor_id": 1, "passenger_count": 1, "pickup_datetime": "2016-05-16T12:00:00",
+            "pickup_longitude": -73.9812, "pickup_latitude": 40.7648,
+            "dropoff_longitude": -73.9708, "dropoff_latitude": 40.7617,
+        }
+        self.trip = service.parse_trip(self.request)
+
+    def tearDown(self):
+        (service.loaded, service.prediction_cache, service.PREDICTION_CACHE_PRECISION,
+         service.PREDICT_BATCH_WINDOW_MS, service.INFERENCE_EXECUTOR, service.executor,
+         service.batcher, service.ADMIN_TOKEN) = self.saved
+
+    def key(self, version="v1", **changes):
+        return service.prediction_cache_key(dict(self.trip, **changes), version)
+
+    def test_key_rounds_coordinates_to_precision(self):
+        self.assertEqual(self.key(), self.key(pickup_latitude=40.7648 + 4e-4))
+        self.assertNotEqual(self.key(), self.key(pickup_latitude=40.7648 + 2e-3))
+        service.PREDICTION_CACHE_PRECISION = 4
+        self.assertNotEqual(self.key(), self.key(pickup_latitude=40.7648 + 4e-4))
+
+    def test_key_buckets_by_minute_of_week(self):
+        # Monday noon a week later shares the key; a minute or a weekday later does not
+        self.assertEqual(self.key(), self.key(pickup_datetime=datetime(2016, 5, 23, 12, 0, 45)))
+        self.assertNotEqual(self.key(), self.key(pickup_datetime=datetime(2016, 5, 16, 12, 1)))
+        self.assertNotEqual(self.key(), self.key(pickup_datetime=datetime(2016, 5, 17, 12, 0)))
+
+    def test_key_carries_model_version(self):
+        self.assertNotEqual(self.key("v1"), self.key("v2"))
+
+    def test_repeated_trip_is_served_from_cache(self):
+        client = TestClient(service.app)
+        first = client.post("/predict", json=self.request)
+        second = client.post("/predict", json=self.request)
+        self.assertEqual(first.json(), second.json())
+        stats = service.prediction_cache.stats()
+        self.assertEqual((stats["hits"], stats["size"]), (1, 1))
+
+    def test_install_model_empties_cache(self):
+        service.prediction_cache.set(self.key(), {"prediction": 600})
+        service.install_model(fixed_model("v2"))
+        self.assertEqual(len(service.prediction_cache), 0)
+        self.assertEqual(service.prediction_cache.stats()["invalidations"], 1)
+
+    def test_admin_reload_empties_cache(self):
+        service.ADMIN_TOKEN = "secret"
+        service.prediction_cache.set(self.key(), {"prediction": 600})
+        with mock.patch.object(service, "load_model", return_value=fixed_model("v2")):
+            response = TestClient(service.app).post("/admin/reload", params={"force": "1"},
+                                                    headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.json()["model_version"], "v2")
+        self.assertEqual(len(service.prediction_cache), 0)
+        self.assertEqual(service.prediction_cache.stats()["invalidations"], 1)
+
+    def test_result_scored_across_a_reload_is_not_cached(self):
+        def reload_mid_scoring():
+            service.loaded = fixed_model("v2", seconds=900.0)
+
+        service.loaded = fixed_model("v1", on_predict=reload_mid_scoring)
+        response = TestClient(service.app).post("/predict", json=self.request)
+        self.assertEqual(response.json()["model_version"], "v1")
+        self.assertEqual(len(service.prediction_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
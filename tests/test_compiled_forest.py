@@ -0,0 +1,101 @@
+# tests/test_compiled_forest.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.compiled_forest import CompiledForest
+
+
+class TestCompiledForest(unittest.TestCase):
+    """Parity between the flat-array forest and scikit-learn"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(21)
+        cls.X = rng.normal(size=(2000, 15))
+        y = 600 + 300 * cls.X[:, 7] + 50 * cls.X[:, 11] ** 2 + rng.normal(scale=20, size=2000)
+        cls.model = RandomForestRegressor(n_estimators=20, max_depth=8, random_state=21)
+        cls.model.fit(cls.X, y)
+        cls.forest = CompiledForest.from_sklearn(cls.model)
+
+    def test_predictions_match_sklearn(self):
+        X = np.random.default_rng(5).normal(size=(500, 15))
+        np.testing.assert_allclose(self.forest.predict(X), self.model.predict(X), rtol=1e-12)
+
+    def test_leaves_match_sklearn(self):
+        leaves = self.forest.apply(self.X[:100]) - self.forest.roots[:, None]
+        np.testing.assert_array_equal(leaves, self.model.apply(self.X[:100]).T)
+
+    def test_single_row(self):
+        row = self.X[:1]
+        np.testing.assert_allclose(self.forest.predict(row), self.model.predict(row), rtol=1e-12)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model_compiled.npz')
+            self.forest.save(path)
+            loaded = CompiledForest.load(path)
+        np.testing.assert_array_equal(loaded.predict(self.X), self.forest.predict(self.X))
+        self.assertEqual(loaded.n_trees, 20)
+
+    def test_memory_mapped_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model_compiled')
+            self.forest.save(path)
+            loaded = CompiledForest.load(path, mmap_mode='r')
+            self.assertIsInstance(loaded.threshold, np.memmap)
+            np.testing.assert_array_equal(loaded.predict(self.X), self.forest.predict(self.X))
+            del loaded
+
+    def test_prune_keeps_full_forest(self):
+        pruned = self.forest.prune()
+        np.testing.assert_array_equal(pruned.predict(self.X), self.forest.predict(self.X))
+        self.assertEqual(pruned.nbytes, self.forest.nbytes)
+
+    def test_prune_to_fewer_trees(self):
+        pruned = self.forest.prune(n_trees=5)
+        np.testing.assert_allclose(pruned.predict(self.X), np.mean(
+            [tree.predict(self.X) for tree in self.model.estimators_[:5]], axis=0), rtol=1e-12)
+        self.assertLess(pruned.nbytes, self.forest.nbytes)
+
+    def test_prune_depth_uses_node_values(self):
+        # Capped at depth 1, each tree predicts the value of the child the row goes to.
+        pruned = self.forest.prune(max_depth=1)
+        expected = []
+        for estimator in self.model.estimators_:
+            tree = estimator.tree_
+            go_left = self.X[:, tree.feature[0]].astype(np.float32) <= tree.threshold[0]
+            child = np.where(go_left, tree.children_left[0], tree.children_right[0])
+            expected.append(tree.value[child, 0, 0])
+        np.testing.assert_allclose(pruned.predict(self.X), np.mean(expected, axis=0), rtol=1e-12)
+        self.assertEqual(pruned.max_depth, 1)
+        self.assertEqual(len(pruned.feature), 3 * self.forest.n_trees)
+
+    def test_resave_keeps_mapped_forest_intact(self):
+        # Retraining while the API serves a memory-mapped copy of the forest.
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model_compiled')
+            self.forest.save(path)
+            live = CompiledForest.load(path, mmap_mode='r')
+            expected = live.predict(self.X[:50])
+            self.forest.prune(n_trees=2, max_depth=2).save(path)
+            np.testing.assert_array_equal(live.predict(self.X[:50]), expected)
+            self.assertEqual(CompiledForest.load(path).n_trees, 2)
+            self.assertEqual(os.listdir(tmp), ['model_compiled'])
+            del live
+
+    def test_rejects_wrong_feature_count(self):
+        with self.assertRaises(ValueError):
+            self.forest.predict(np.zeros((1, 14)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+# tests/test_executor.py
+
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import service
+from src.executor import make_executor
+from src.models.compiled_forest import CompiledForest
+
+initialized = []
+
+
+def mark_initialized(tag):
+    initialized.append(tag)
+
+
+def worker_state():
+    # Runs inside the pool: what its initializer left behind, and where.
+    return list(initialized), os.getpid(), threading.current_thread().name
+
+
+class TestMakeExecutor(unittest.TestCase):
+    """The pools INFERENCE_EXECUTOR selects"""
+
+    def setUp(self):
+        initialized.clear()
+
+    def test_inline_has_no_pool(self):
+        self.assertIsNone(make_executor("inline", 2))
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            make_executor("gpu")
+
+    def test_thread_workers_run_initializer(self):
+        pool = make_executor("thread", 1, initializer=mark_initialized, initargs=("thread",))
+        try:
+            self.assertIsInstance(pool, ThreadPoolExecutor)
+            state, pid, thread_name = pool.submit(worker_state).result()
+        finally:
+            pool.shutdown()
+        self.assertEqual(state, ["thread"])
+        self.assertEqual(pid, os.getpid())
+        self.assertTrue(thread_name.startswith("inference"))
+
+    def test_process_workers_run_initializer(self):
+        pool = make_executor("process", 1, initializer=mark_initialized, initargs=("process",))
+        try:
+            self.assertIsInstance(pool, ProcessPoolExecutor)
+            state, pid, _ = pool.submit(worker_state).result()
+        finally:
+            pool.shutdown()
+        # The initializer ran in the spawned worker, not in this process
+        self.assertEqual(state, ["process"])
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual(initialized, [])
+
+
+class TestReloadExecutor(unittest.TestCase):
+    """Process workers hold their own model, so a reload replaces the pool"""
+
+    def setUp(self):
+        # The trained model is tracked by DVC and absent from a bare checkout.
+        if not os.path.exists(service.model_artifact_path()):
+            raise unittest.SkipTest("trained model not found; run dvc pull")
+        self.saved = (service.INFERENCE_EXECUTOR, service.INFERENCE_WORKERS, service.executor)
+
+    def tearDown(self):
+        if service.executor is not None and service.executor is not self.saved[2]:
+            service.executor.shutdown()
+        service.INFERENCE_EXECUTOR, service.INFERENCE_WORKERS, service.executor = self.saved
+
+    def reload(self, kind):
+        service.INFERENCE_EXECUTOR = kind
+        service.INFERENCE_WORKERS = 1
+        service.executor = None
+        old_pool = service.get_executor()
+        result = asyncio.run(service.reload_model(force=True))
+        self.assertTrue(result["reloaded"])
+        return old_pool
+
+    def test_process_pool_is_rebuilt(self):
+        old_pool = self.reload("process")
+        try:
+            self.assertIsInstance(service.executor, ProcessPoolExecutor)
+            self.assertIsNot(service.executor, old_pool)
+            # The new workers serve requests; the old pool no longer takes work
+            self.assertEqual(service.executor.submit(int, "7").result(), 7)
+            with self.assertRaises(RuntimeError):
+                old_pool.submit(int, "7")
+        finally:
+            old_pool.shutdown()
+
+    def test_thread_pool_is_kept(self):
+        old_pool = self.reload("thread")
+        self.assertIs(service.executor, old_pool)
+
+
+class TestWatchModel(unittest.TestCase):
+    """One publish of a compiled directory is one reload, even in auto mode"""
+
+    def setUp(self):
+        self.saved = (service.model_path, service.compiled_model_path, service.zone_stats_path,
+                      service.MODEL_FORMAT, service.MODEL_WATCH_SECONDS, service.loaded)
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(200, len(service.REQUIRED_FEATURES)))
+        self.forests = []
+        for seed in (1, 2):
+            model = RandomForestRegressor(n_estimators=3, max_depth=4, random_state=seed)
+            self.forests.append(model.fit(X, rng.normal(size=200)))
+        service.model_path = os.path.join(self.tmp.name, 'model.joblib')
+        service.compiled_model_path = os.path.join(self.tmp.name, 'model_compiled')
+        service.zone_stats_path = os.path.join(self.tmp.name, 'zone_stats.npz')
+        service.MODEL_FORMAT = "auto"
+        service.MODEL_WATCH_SECONDS = 0.01
+        joblib.dump(self.forests[0], service.model_path)
+        CompiledForest.from_sklearn(self.forests[0]).save(service.compiled_model_path)
+        service.install_model(service.load_model())
+
+    def tearDown(self):
+        (service.model_path, service.compiled_model_path, service.zone_stats_path,
+         service.MODEL_FORMAT, service.MODEL_WATCH_SECONDS, service.loaded) = self.saved
+        self.tmp.cleanup()
+
+    async def publish_under_watcher(self):
+        target = service.compiled_model_path
+        staging = os.path.join(self.tmp.name, 'staging')
+        CompiledForest.from_sklearn(self.forests[1]).save(staging)
+        reloads = service.model_reloads
+        watcher = asyncio.create_task(service.watch_model())
+        try:
+            await asyncio.sleep(0.05)
+            # replace_directory's two renames, with the watcher polling in between
+            os.replace(target, os.path.join(self.tmp.name, '.model_compiled.old'))
+            await asyncio.sleep(0.1)
+            os.replace(staging, target)
+            await asyncio.sleep(0.2)
+        finally:
+            watcher.cancel()
+        return service.model_reloads - reloads
+
+    def test_directory_swap_reloads_once(self):
+        previous = service.loaded.version
+        self.assertEqual(asyncio.run(self.publish_under_watcher()), 1)
+        self.assertEqual(service.loaded.path, service.compiled_model_path)
+        self.assertIsInstance(service.loaded.model, CompiledForest)
+        self.assertNotEqual(service.loaded.version, previous)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# tests/test_features.py
+
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import service
+
+
+# Frozen copy of the feature math the model was trained and first served
+# with, before the shared geo and temporal kernels replaced it. The fast
+# paths are checked against this, not against code built on the same kernels.
+def reference_haversine_array(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    AVG_EARTH_RADIUS = 6371
+    lat = lat2 - lat1
+    lng = lng2 - lng1
+    d = np.sin(lat * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(lng * 0.5) ** 2
+    h = 2 * AVG_EARTH_RADIUS * np.arcsin(np.sqrt(d))
+    return h
+
+
+def reference_dummy_manhattan_distance(lat1, lng1, lat2, lng2):
+    a = reference_haversine_array(lat1, lng1, lat1, lng2)
+    b = reference_haversine_array(lat1, lng1, lat2, lng1)
+    return a + b
+
+
+def reference_bearing_array(lat1, lng1, lat2, lng2):
+    lng_delta_rad = np.radians(lng2 - lng1)
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    y = np.sin(lng_delta_rad) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lng_delta_rad)
+    return np.degrees(np.arctan2(y, x))
+
+
+def reference_preprocess_input(input_data):
+    df = pd.DataFrame([input_data])
+    df['pickup_datetime'] = pd.to_datetime(df['pickup_datetime'])
+    df['pickup_weekday'] = df['pickup_datetime'].dt.weekday
+    df['pickup_hour'] = df['pickup_datetime'].dt.hour
+    df['pickup_minute'] = df['pickup_datetime'].dt.minute
+    base_date = pd.to_datetime('2016-01-01 00:00:00')
+    df['pickup_dt'] = (df['pickup_datetime'] - base_date).dt.total_seconds()
+    df['pickup_week_hour'] = df['pickup_weekday'] * 24 + df['pickup_hour']
+    coords = (df['pickup_latitude'].values, df['pickup_longitude'].values,
+              df['dropoff_latitude'].values, df['dropoff_longitude'].values)
+    df['distance_haversine'] = reference_haversine_array(*coords)
+    df['distance_dummy_manhattan'] = reference_dummy_manhattan_distance(*coords)
+    df['direction'] = reference_bearing_array(*coords)
+    return df[service.REQUIRED_FEATURES]
+
+
+def reference_row(trip):
+    return reference_preprocess_input(dict(trip)).to_numpy(dtype=np.float64)[0]
+
+
+def random_trips(n, seed=2023):
+    """Synthetic trips inside the NYC bounding box spread over 2016"""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2016-01-01T00:00:00')
+    offsets = rng.integers(0, 366 * 24 * 3600, n)
+    trips = []
+    for i in range(n):
+        pickup = str(start + np.timedelta64(int(offsets[i]), 's'))
+        if i % 3 == 0:
+            pickup = pickup.replace('T', ' ')
+        trips.append(service.parse_trip({
+            "vendor_id": int(rng.integers(1, 3)),
+            "passenger_count": int(rng.integers(1, 7)),
+            "pickup_datetime": pickup,
+            "pickup_longitude": float(rng.uniform(-74.05, -73.75)),
+            "pickup_latitude": float(rng.uniform(40.60, 40.90)),
+            "dropoff_longitude": float(rng.uniform(-74.05, -73.75)),
+            "dropoff_latitude": float(rng.uniform(40.60, 40.90)),
+        }))
+    return trips
+
+
+class TestFastFeatureBuilder(unittest.TestCase):
+    """Parity between the fast feature paths and the original pandas math"""
+
+    def assertBitIdentical(self, expected, actual):
+        self.assertEqual(expected.shape, actual.shape)
+        np.testing.assert_array_equal(expected.view(np.int64), actual.view(np.int64))
+
+    def test_row_matches_reference(self):
+        for trip in random_trips(200):
+            self.assertBitIdentical(reference_row(trip), service.build_feature_row(trip))
+
+    def test_dataframe_path_matches_reference(self):
+        for trip in random_trips(50, seed=11):
+            expected = reference_row(trip)
+            self.assertBitIdentical(expected, service.preprocess_input(dict(trip)).to_numpy(dtype=np.float64)[0])
+
+    def test_matrix_and_batch_path_match_reference(self):
+        trips = random_trips(50, seed=7)
+        expected = np.array([reference_row(t) for t in trips])
+        self.assertBitIdentical(expected, service.build_feature_matrix(trips))
+        self.assertBitIdentical(expected, service.preprocess_batch([dict(t) for t in trips]).to_numpy(dtype=np.float64))
+
+    def test_row_fills_preallocated_buffer(self):
+        trip = random_trips(1)[0]
+        out = np.zeros(len(service.REQUIRED_FEATURES))
+        result = service.build_feature_row(trip, out)
+        self.assertIs(result, out)
+
+    def test_identical_pickup_and_dropoff(self):
+        trip = random_trips(1)[0]
+        trip["dropoff_latitude"] = trip["pickup_latitude"]
+        trip["dropoff_longitude"] = trip["pickup_longitude"]
+        self.assertBitIdentical(reference_row(trip), service.build_feature_row(trip))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+# tests/test_geo.py
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.geo import (
+    BLOCK_SIZE, bearing_array, dummy_manhattan_distance, geo_features, geo_features_scalar,
+    haversine_array
+)
+
+
+def random_coords(n, seed=0):
+    rng = np.random.default_rng(seed)
+    coords = [rng.uniform(40.5, 41.0, n), rng.uniform(-74.3, -73.6, n),
+              rng.uniform(40.5, 41.0, n), rng.uniform(-74.3, -73.6, n)]
+    # Some zero-length trips
+    coords[2][:10] = coords[0][:10]
+    coords[3][:10] = coords[1][:10]
+    return coords
+
+
+class TestGeoKernel(unittest.TestCase):
+    """The fused kernel against the reference per-feature functions"""
+
+    def assertBitIdentical(self, expected, actual):
+        np.testing.assert_array_equal(expected.view(np.int64), actual.view(np.int64))
+
+    def test_float64_matches_reference_bit_for_bit(self):
+        coords = random_coords(2 * BLOCK_SIZE + 17)
+        out = geo_features(*coords)
+        self.assertBitIdentical(haversine_array(*coords), out[0])
+        self.assertBitIdentical(dummy_manhattan_distance(*coords), out[1])
+        self.assertBitIdentical(bearing_array(*coords), out[2])
+
+    def test_scalars(self):
+        out = geo_features(40.7648, -73.9812, 40.7617, -73.9708)
+        self.assertEqual(out.shape, (3, 1))
+        self.assertEqual(out[0, 0], haversine_array(40.7648, -73.9812, 40.7617, -73.9708))
+
+    def test_scalar_form_matches_array_form(self):
+        coords = random_coords(500, seed=3)
+        out = geo_features(*coords)
+        scalar = np.array([geo_features_scalar(*trip) for trip in zip(*coords)]).T
+        self.assertBitIdentical(out, scalar)
+
+    def test_writes_into_out_buffer(self):
+        coords = random_coords(100)
+        out = np.full((3, 100), np.nan)
+        self.assertIs(geo_features(*coords, out=out), out)
+        self.assertFalse(np.isnan(out).any())
+
+    def test_float32_mode(self):
+        coords = random_coords(1000)
+        out = geo_features(*coords, dtype=np.float32)
+        self.assertEqual(out.dtype, np.float32)
+        np.testing.assert_allclose(out[0], haversine_array(*coords), atol=1e-2)
+        np.testing.assert_allclose(out[1], dummy_manhattan_distance(*coords), atol=1e-2)
+
+
+if __name__ == "__main__":
+    unittest.main()
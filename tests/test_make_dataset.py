@@ -0,0 +1,79 @@
+# tests/test_make_dataset.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'data')))
+
+from make_dataset import ingest, is_trip_store, list_partitions, load_manifest, read_trips
+
+
+def raw_day(ids, pickups):
+    n = len(ids)
+    return pd.DataFrame({
+        'id': ids,
+        'vendor_id': [1] * n,
+        'pickup_datetime': pickups,
+        'dropoff_datetime': pickups,
+        'passenger_count': [1] * n,
+        'pickup_longitude': [-73.98] * n,
+        'pickup_latitude': [40.75] * n,
+        'dropoff_longitude': [-73.96] * n,
+        'dropoff_latitude': [40.77] * n,
+        'store_and_fwd_flag': ['N'] * n,
+        'trip_duration': [600] * n,
+    })
+
+
+class TestTripStore(unittest.TestCase):
+    """Incremental ingestion into the pickup_date-partitioned store"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = os.path.join(self.tmp.name, 'trips')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, frame):
+        path = os.path.join(self.tmp.name, name)
+        frame.to_csv(path, index=False)
+        return path
+
+    def test_ingest_partitions_by_pickup_date(self):
+        day = self.write('day1.csv', raw_day(['a', 'b', 'c'], ['2016-01-01 08:00:00', '2016-01-01 23:59:59',
+                                                              '2016-01-02 00:00:00']))
+        self.assertEqual(ingest([day], self.store), ['2016-01-01', '2016-01-02'])
+        self.assertTrue(is_trip_store(self.store))
+        self.assertEqual(list_partitions(self.store), ['2016-01-01', '2016-01-02'])
+        self.assertEqual(len(read_trips(self.store)), 3)
+
+    def test_duplicates_and_reruns_are_skipped(self):
+        first = self.write('day1.csv', raw_day(['a', 'b'], ['2016-01-01 08:00:00', '2016-01-01 09:00:00']))
+        ingest([first], self.store)
+        # Late file repeating trip b, with a new trip on the next day.
+        second = self.write('day2.csv', raw_day(['b', 'c', 'c'], ['2016-01-01 09:00:00', '2016-01-02 10:00:00',
+                                                                  '2016-01-02 10:00:00']))
+        self.assertEqual(ingest([first, second], self.store), ['2016-01-02'])
+        trips = read_trips(self.store)
+        self.assertEqual(sorted(trips['id']), ['a', 'b', 'c'])
+        self.assertEqual(load_manifest(self.store)['files']['day2.csv']['rows'], 1)
+        self.assertEqual(ingest([first, second], self.store), [])
+
+    def test_read_by_date_range(self):
+        days = ['2016-01-0%d 12:00:00' % d for d in range(1, 6)]
+        ingest([self.write('week.csv', raw_day(list('abcde'), days))], self.store)
+        trips = read_trips(self.store, '2016-01-02', '2016-01-04', columns=['id', 'pickup_date'])
+        self.assertEqual(sorted(trips['id']), ['b', 'c', 'd'])
+        self.assertEqual(len(read_trips(self.store, start='2016-01-05')), 1)
+        self.assertEqual(len(read_trips(self.store, end='2016-01-01')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+# tests/test_metrics.py
+
+import unittest
+import os
+import sys
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import Registry
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the Prometheus exposition"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1.0))
+        latency.labels("predict").observe(0.05)
+        latency.labels("predict").observe(0.5)
+        latency.labels("predict").observe(5.0)
+        text = registry.render()
+        self.assertIn('stage_seconds_bucket{stage="predict",le="0.1"} 1', text)
+        self.assertIn('stage_seconds_bucket{stage="predict",le="1.0"} 2', text)
+        self.assertIn('stage_seconds_bucket{stage="predict",le="+Inf"} 3', text)
+        self.assertIn('stage_seconds_count{stage="predict"} 3', text)
+
+    def test_counters_gauges_and_collectors(self):
+        registry = Registry()
+        requests = registry.counter("requests_total", "Requests.", ["status"])
+        in_flight = registry.gauge("in_flight", "In flight.")
+        registry.add_collector(lambda: [("cache_hits_total", "counter", "Hits.", 7)])
+
+        requests.labels("200").inc()
+        requests.labels("200").inc()
+        with in_flight.labels().track_inprogress():
+            self.assertIn("in_flight 1", registry.render())
+
+        text = registry.render()
+        self.assertIn('requests_total{status="200"} 2', text)
+        self.assertIn("in_flight 0", text)
+        self.assertIn("# TYPE cache_hits_total counter\ncache_hits_total 7", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
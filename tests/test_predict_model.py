@@ -0,0 +1,79 @@
+# tests/test_predict_model.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+from click.testing import CliRunner
+from sklearn.ensemble import RandomForestRegressor
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'models')))
+
+from predict_model import main
+from train_model import TARGET, TRAIN_FEATURES
+
+
+def raw_test_trips(n, seed=0):
+    # The columns of the raw test.csv: no dropoff time or duration.
+    rng = np.random.default_rng(seed)
+    pickup = pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 182 * 86400, n), unit='s')
+    return pd.DataFrame({
+        'id': [f'id{i:07d}' for i in range(n)],
+        'vendor_id': rng.integers(1, 3, n),
+        'pickup_datetime': pickup.strftime('%Y-%m-%d %H:%M:%S'),
+        'passenger_count': rng.integers(1, 7, n),
+        'pickup_longitude': rng.uniform(-74.05, -73.75, n),
+        'pickup_latitude': rng.uniform(40.60, 40.90, n),
+        'dropoff_longitude': rng.uniform(-74.05, -73.75, n),
+        'dropoff_latitude': rng.uniform(40.60, 40.90, n),
+        'store_and_fwd_flag': rng.choice(['N', 'Y'], n),
+    })
+
+
+class TestPredictModel(unittest.TestCase):
+    """Chunked batch scoring from the command line"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = os.path.join(self.tmp.name, 'test.csv')
+        raw_test_trips(250).to_csv(self.raw, index=False)
+
+        rng = np.random.default_rng(1)
+        X = pd.DataFrame(rng.uniform(0, 1, (200, len(TRAIN_FEATURES))), columns=TRAIN_FEATURES)
+        model = RandomForestRegressor(n_estimators=3, max_depth=4, random_state=0)
+        model.fit(X, rng.uniform(60, 3600, 200))
+        self.model = os.path.join(self.tmp.name, 'model.joblib')
+        joblib.dump(model, self.model)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def score(self, output_name):
+        output = os.path.join(self.tmp.name, output_name)
+        result = CliRunner().invoke(main, [self.raw, output, '--model', self.model,
+                                           '--chunksize', '100', '--n-jobs', '1'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return output
+
+    def test_scores_every_trip_to_csv(self):
+        predictions = pd.read_csv(self.score('predictions.csv'))
+        self.assertEqual(list(predictions.columns), ['id', TARGET])
+        self.assertEqual(len(predictions), 250)
+        self.assertEqual(predictions['id'].tolist(), raw_test_trips(250)['id'].tolist())
+        self.assertTrue((predictions[TARGET] > 0).all())
+
+    def test_parquet_output_matches_csv(self):
+        csv = pd.read_csv(self.score('predictions.csv'))
+        parquet = pd.read_parquet(self.score('predictions.parquet'))
+        self.assertEqual(len(parquet), 250)
+        np.testing.assert_allclose(parquet[TARGET], csv[TARGET])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# tests/test_prune_model.py
+
+import unittest
+import os
+import sys
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'models')))
+
+from prune_model import choose, tree_counts
+
+
+class TestPruneModel(unittest.TestCase):
+    """Choosing the serving forest from the size/latency/error sweep"""
+
+    results = [
+        {'n_trees': 50, 'max_depth': 8, 'rmsle': 0.250, 'latency_ms': 0.20, 'nbytes': 600_000},
+        {'n_trees': 10, 'max_depth': 8, 'rmsle': 0.252, 'latency_ms': 0.15, 'nbytes': 120_000},
+        {'n_trees': 10, 'max_depth': 4, 'rmsle': 0.270, 'latency_ms': 0.08, 'nbytes': 8_000},
+        {'n_trees': 2, 'max_depth': 8, 'rmsle': 0.262, 'latency_ms': 0.12, 'nbytes': 24_000},
+    ]
+
+    def test_tree_counts(self):
+        self.assertEqual(tree_counts(50), [1, 2, 4, 8, 16, 32, 50])
+        self.assertEqual(tree_counts(1), [1])
+
+    def test_smallest_within_error(self):
+        self.assertEqual(choose(self.results, 0.255)['n_trees'], 10)
+        self.assertEqual(choose(self.results, 0.265)['nbytes'], 24_000)
+
+    def test_budgets(self):
+        self.assertEqual(choose(self.results, 0.30, latency_budget_ms=0.1)['max_depth'], 4)
+        self.assertIsNone(choose(self.results, 0.255, memory_budget_mb=0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
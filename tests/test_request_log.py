@@ -0,0 +1,64 @@
+# tests/test_request_log.py
+
+import unittest
+import os
+import sys
+import json
+import tempfile
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.request_log import RequestLogger
+
+
+class TestRequestLogger(unittest.TestCase):
+    """Test cases for the background JSON request log"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "logs", "api.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_records(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_records_are_written_as_json_lines(self):
+        log = RequestLogger(self.path, features=lambda trip: {"double": trip["x"] * 2},
+                            name="test.request_log.json")
+        log.start()
+        log.log("prediction", trip={"x": 2}, prediction=120, timings={"parse": 0.001})
+        log.stop()
+
+        [record] = self.read_records()
+        self.assertEqual(record["message"], "prediction")
+        self.assertEqual(record["prediction"], 120)
+        self.assertEqual(record["features"], {"double": 4})
+        self.assertEqual(log.stats()["written"], 1)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        log = RequestLogger(self.path, queue_size=2, name="test.request_log.full")
+        log.logger.addHandler(log.handler)  # enqueue without a writer draining the queue
+        for i in range(5):
+            log.handler.handle(log.logger.makeRecord(log.logger.name, 20, "", 0, "r", (), None))
+        log.logger.removeHandler(log.handler)
+        self.assertEqual(log.stats()["dropped"], 3)
+
+    def test_sampling_and_disabled_log(self):
+        log = RequestLogger(self.path, sample_rate=0.0, name="test.request_log.sampled")
+        log.start()
+        self.assertFalse(any(log.sample() for _ in range(100)))
+        log.stop()
+
+        disabled = RequestLogger("", name="test.request_log.disabled")
+        disabled.start()
+        self.assertFalse(disabled.sample())
+        disabled.log("prediction", prediction=1)
+        self.assertEqual(disabled.stats()["queued"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+# tests/test_temporal.py
+
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.temporal import (
+    REFERENCE_EPOCH, TEMPORAL_FEATURES, epoch_seconds, load_reference_epoch, temporal_features,
+    temporal_features_scalar
+)
+
+
+def random_timestamps(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # 1938 to 2065, so pre-1970 (negative epoch seconds) is covered too
+    return pd.Series(pd.to_datetime(rng.integers(-10**9, 3 * 10**9, n), unit='s'))
+
+
+class TestTemporalFeatures(unittest.TestCase):
+    """The epoch-seconds engine against pandas datetime accessors"""
+
+    def expected(self, timestamps):
+        return {
+            'pickup_weekday': timestamps.dt.weekday,
+            'pickup_hour': timestamps.dt.hour,
+            'pickup_minute': timestamps.dt.minute,
+            'pickup_dt': (timestamps - pd.Timestamp('2016-01-01')).dt.total_seconds(),
+            'pickup_week_hour': timestamps.dt.weekday * 24 + timestamps.dt.hour,
+        }
+
+    def test_matches_pandas(self):
+        timestamps = random_timestamps(50000)
+        features = temporal_features(epoch_seconds(timestamps.values))
+        for name, values in self.expected(timestamps).items():
+            np.testing.assert_array_equal(features[name], values.values, err_msg=name)
+
+    def test_scalar_matches_array(self):
+        timestamps = random_timestamps(500, seed=1)
+        features = temporal_features(epoch_seconds(timestamps.values))
+        for i, timestamp in enumerate(timestamps):
+            expected = tuple(features[name][i] for name in TEMPORAL_FEATURES)
+            self.assertEqual(temporal_features_scalar(timestamp.to_pydatetime()), expected)
+
+    def test_reference_epoch_is_shared(self):
+        self.assertEqual(REFERENCE_EPOCH, load_reference_epoch())
+        self.assertEqual(REFERENCE_EPOCH, pd.Timestamp('2016-01-01').value // 10**9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# tests/test_train_model.py
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'models')))
+
+from train_model import (TARGET, TRAIN_FEATURES, available_memory, count_rows, iter_feature_chunks, load_features,
+                         plan_workers, train_model_parallel, train_model_streaming)
+
+
+class TestStreamingTraining(unittest.TestCase):
+    """Out-of-core training over chunks of the processed dataset"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(21)
+        cls.frame = pd.DataFrame(rng.normal(size=(1000, len(TRAIN_FEATURES))), columns=TRAIN_FEATURES)
+        cls.frame[TARGET] = 600 + 300 * cls.frame['distance_haversine']
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.parquet = os.path.join(cls.tmp.name, 'train.parquet')
+        cls.csv = os.path.join(cls.tmp.name, 'train.csv')
+        cls.frame.to_parquet(cls.parquet, row_group_size=300)
+        cls.frame.to_csv(cls.csv, index=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_count_rows(self):
+        self.assertEqual(count_rows(self.parquet), 1000)
+        self.assertEqual(count_rows(self.csv), 1000)
+
+    def test_count_rows_matches_csv_reader(self):
+        # A quoted field with a newline in it
+        path = os.path.join(self.tmp.name, 'quoted.csv')
+        with open(path, 'w') as f:
+            f.write('note,' + ','.join(TRAIN_FEATURES + [TARGET]) + '\n')
+            f.write('"two\nlines",' + ','.join(['1'] * (len(TRAIN_FEATURES) + 1)) + '\n')
+            f.write('plain,' + ','.join(['2'] * (len(TRAIN_FEATURES) + 1)) + '\n')
+        self.assertEqual(count_rows(path), 2)
+        self.assertEqual(count_rows(path, chunksize=1), 2)
+        model = train_model_streaming(path, n_estimators=2, max_depth=2, seed=21, chunksize=1)
+        self.assertEqual(len(model.estimators_), 2)
+
+    def test_load_features_reads_only_requested_columns(self):
+        columns = [TARGET, 'pickup_hour', 'vendor_id']
+        for path in (self.parquet, self.csv):
+            loaded = load_features(path, columns)
+            self.assertEqual(list(loaded.columns), columns)
+            np.testing.assert_allclose(loaded[TARGET], self.frame[TARGET])
+
+    def test_chunks_are_float32_and_cover_every_row(self):
+        for path in (self.parquet, self.csv):
+            chunks = list(iter_feature_chunks(path, TRAIN_FEATURES + [TARGET], 250))
+            self.assertEqual(sum(len(c) for c in chunks), 1000)
+            self.assertTrue(all(len(c) <= 250 for c in chunks))
+            self.assertTrue(all((c.dtypes == np.float32).all() for c in chunks))
+
+    def test_streaming_forest_has_all_trees(self):
+        # Row groups of 300 and chunks of 250 give short batches to carry over.
+        model = train_model_streaming(self.parquet, n_estimators=10, max_depth=4, seed=21, chunksize=250)
+        self.assertEqual(len(model.estimators_), 10)
+        self.assertFalse(model.warm_start)
+        predictions = model.predict(self.frame[TRAIN_FEATURES].astype(np.float32))
+        self.assertGreater(np.corrcoef(predictions, self.frame[TARGET])[0, 1], 0.9)
+
+    def test_fits_never_exceed_chunksize(self):
+        # Ten chunks for two trees: each tree sees a sample of five chunks.
+        fitted_rows = []
+        fit = RandomForestRegressor.fit
+
+        def recording_fit(model, X, y):
+            fitted_rows.append(len(X))
+            return fit(model, X, y)
+
+        for path in (self.parquet, self.csv):
+            fitted_rows.clear()
+            with mock.patch.object(RandomForestRegressor, 'fit', recording_fit):
+                model = train_model_streaming(path, n_estimators=2, max_depth=4, seed=21, chunksize=100)
+            self.assertEqual(len(model.estimators_), 2)
+            self.assertEqual(len(fitted_rows), 2)
+            self.assertLessEqual(max(fitted_rows), 100)
+
+
+class TestParallelTraining(unittest.TestCase):
+    """Tree-per-task training across worker processes"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(21)
+        cls.X = pd.DataFrame(rng.normal(size=(500, len(TRAIN_FEATURES))), columns=TRAIN_FEATURES).astype(np.float32)
+        cls.y = 600 + 300 * cls.X['distance_haversine']
+
+    def test_forest_does_not_depend_on_worker_count(self):
+        serial, serial_report = train_model_parallel(self.X, self.y, 4, 4, 21, n_jobs=1)
+        parallel, parallel_report = train_model_parallel(self.X, self.y, 4, 4, 21, n_jobs=2)
+        self.assertEqual(serial_report['workers'], 1)
+        self.assertEqual(parallel_report['workers'], 2)
+        self.assertEqual(len(parallel.estimators_), 4)
+        np.testing.assert_array_equal(serial.predict(self.X), parallel.predict(self.X))
+
+    def test_report_has_per_tree_timings(self):
+        _, report = train_model_parallel(self.X, self.y, 3, 4, 21)
+        self.assertEqual(len(report['tree_seconds']), 3)
+        self.assertAlmostEqual(report['total_tree_seconds'], sum(report['tree_seconds']))
+        self.assertGreater(report['parallelism'], 0)
+        self.assertIsNone(report['speedup'])
+
+    def test_measured_speedup_against_serial_fit(self):
+        _, report = train_model_parallel(self.X, self.y, 4, 4, 21, n_jobs=2, measure_speedup=True)
+        self.assertEqual(report['workers'], 2)
+        self.assertGreater(report['serial_wall_seconds'], 0)
+        self.assertAlmostEqual(report['speedup'], report['serial_wall_seconds'] / report['wall_seconds'])
+
+    def test_workers_capped_by_trees(self):
+        self.assertEqual(plan_workers(8, 1000, 2, 0.5)[0], 2)
+
+    @unittest.skipIf(available_memory() is None, "available memory unknown on this platform")
+    def test_workers_capped_by_memory(self):
+        # A petabyte-scale working set per tree leaves room for one worker only.
+        self.assertEqual(plan_workers(8, 10 ** 14, 50, 0.5)[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_tune_model.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'models')))
+
+from tune_model import ScoreCache, candidate_key, expand_grid, search, split_holdout, write_params
+
+
+class TestTuneModel(unittest.TestCase):
+    """Successive-halving search with cached candidate scores"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(21)
+        X = rng.normal(size=(600, 15)).astype(np.float32)
+        y = 600 + 300 * np.abs(X[:, 7]) + rng.normal(scale=20, size=600)
+        self.settings = {'validation_split': 0.2, 'seed': 21}
+        self.data = split_holdout(X, y, 0.2, 21)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_expand_grid(self):
+        candidates = expand_grid({'n_estimators': [5, 10], 'max_depth': [2, 4, 6]})
+        self.assertEqual(len(candidates), 6)
+        self.assertIn({'n_estimators': 10, 'max_depth': 4}, candidates)
+
+    def test_candidate_key_changes_with_params_rows_and_data(self):
+        key = candidate_key({'max_depth': 4}, 100, 'abc', self.settings)
+        self.assertEqual(key, candidate_key({'max_depth': 4}, 100, 'abc', dict(self.settings)))
+        self.assertNotEqual(key, candidate_key({'max_depth': 6}, 100, 'abc', self.settings))
+        self.assertNotEqual(key, candidate_key({'max_depth': 4}, 200, 'abc', self.settings))
+        self.assertNotEqual(key, candidate_key({'max_depth': 4}, 100, 'abd', self.settings))
+
+    def test_halving_narrows_to_one_and_reuses_cache(self):
+        candidates = expand_grid({'n_estimators': [5], 'max_depth': [1, 2, 4, 6]})
+        tune_params = {'halving_factor': 2, 'min_rows': 100, 'n_jobs': 1}
+        cache = ScoreCache(self.tmp.name)
+        best, history = search(candidates, self.data, cache, 'abc', self.settings, tune_params)
+        self.assertEqual([len(r['results']) for r in history], [4, 2, 1])
+        self.assertEqual(history[-1]['rows'], len(self.data[0]))
+        self.assertEqual(cache.hits, 0)
+
+        cache = ScoreCache(self.tmp.name)
+        again, _ = search(candidates, self.data, cache, 'abc', self.settings, tune_params)
+        self.assertEqual(cache.hits, 7)
+        self.assertEqual(again, best)
+
+    def test_write_params_keeps_comments(self):
+        path = os.path.join(self.tmp.name, 'params.yaml')
+        with open(path, 'w') as f:
+            f.write("train_model:\n  # trees\n  n_estimators: 50\n  max_depth: 8\nother:\n  max_depth: 3\n")
+        write_params(path, 'train_model', {'n_estimators': 100, 'max_depth': 12})
+        with open(path) as f:
+            self.assertEqual(f.read(), "train_model:\n  # trees\n  n_estimators: 100\n  max_depth: 12\n"
+                                       "other:\n  max_depth: 3\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# tests/test_zones.py
+
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path for imports if needed
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.features.zones import ALL_HOURS, ZoneGrid, ZonePairStats, ZoneStatsAccumulator
+
+
+def training_frame():
+    # Two trips an hour apart from Midtown to the Financial District, one at
+    # a different hour, and one from outside the grid.
+    return pd.DataFrame({
+        'pickup_latitude': [40.755, 40.755, 40.755, 40.10],
+        'pickup_longitude': [-73.985, -73.985, -73.985, -73.985],
+        'dropoff_latitude': [40.707, 40.707, 40.707, 40.707],
+        'dropoff_longitude': [-74.011, -74.011, -74.011, -74.011],
+        'pickup_week_hour': [8, 8, 20, 8],
+        'distance_haversine': [6.0, 6.0, 6.0, 70.0],
+        'trip_duration': [1200, 1800, 900, 3600],
+    })
+
+
+class TestZoneGrid(unittest.TestCase):
+    """Grid binning, vectorized and scalar"""
+
+    def test_vectorized_and_scalar_agree(self):
+        grid = ZoneGrid(0.01)
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(40.3, 41.1, 2000)
+        lng = rng.uniform(-74.5, -73.5, 2000)
+        zones = grid.zone_of(lat, lng)
+        self.assertEqual(zones.tolist(), [grid.zone_of_one(a, b) for a, b in zip(lat, lng)])
+        self.assertTrue(((zones >= 0) & (zones < grid.n_zones)).all())
+
+    def test_points_off_the_grid_share_one_zone(self):
+        grid = ZoneGrid(0.01)
+        self.assertEqual(grid.zone_of_one(0.0, 0.0), grid.outside)
+        self.assertEqual(grid.zone_of([0.0, 50.0], [0.0, -70.0]).tolist(), [grid.outside] * 2)
+
+
+class TestZonePairStats(unittest.TestCase):
+    """Zone-pair aggregates and their fallbacks"""
+
+    def setUp(self):
+        self.grid = ZoneGrid(0.01)
+        self.stats = ZonePairStats.build(training_frame(), self.grid, min_trips=2)
+        self.pickup = self.grid.zone_of_one(40.755, -73.985)
+        self.dropoff = self.grid.zone_of_one(40.707, -74.011)
+
+    def test_hourly_then_weekly_then_global(self):
+        hourly = self.stats.lookup_one(self.pickup, self.dropoff, 8)
+        self.assertEqual((hourly['trips'], hourly['level']), (2, 'pair_hour'))
+        self.assertEqual(hourly['median_duration'], 1500)
+        # One trip at hour 20 is below min_trips, so the week's figures are used
+        weekly = self.stats.lookup_one(self.pickup, self.dropoff, 20)
+        self.assertEqual((weekly['trips'], weekly['median_duration'], weekly['level']), (3, 1200, 'pair'))
+        # No trips back this pair: global figures, without claiming the global trip count
+        unseen = self.stats.lookup_one(self.dropoff, self.pickup, 8)
+        self.assertEqual((unseen['trips'], unseen['median_duration'], unseen['level']), (0, 1500, 'global'))
+        self.assertEqual(self.stats.fallback['trips'], 4)
+
+    def test_vectorized_lookup_matches_scalar(self):
+        pickup = [self.pickup, self.pickup, self.dropoff]
+        dropoff = [self.dropoff, self.dropoff, self.pickup]
+        hours = [8, 20, ALL_HOURS - 1]
+        found = self.stats.lookup(pickup, dropoff, hours)
+        for i in range(3):
+            one = self.stats.lookup_one(pickup[i], dropoff[i], hours[i])
+            self.assertEqual({name: found[name][i].item() for name in one}, one)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'zone_stats.npz')
+            self.stats.save(path)
+            loaded = ZonePairStats.load(path)
+        self.assertEqual(loaded.grid.n_zones, self.grid.n_zones)
+        np.testing.assert_array_equal(loaded.keys, self.stats.keys)
+        self.assertEqual(loaded.lookup_one(self.pickup, self.dropoff, 8),
+                         self.stats.lookup_one(self.pickup, self.dropoff, 8))
+
+
+class TestZoneStatsAccumulator(unittest.TestCase):
+    """Chunked zone stats against the in-memory build"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 6000
+        self.frame = pd.DataFrame({
+            'pickup_latitude': rng.choice([40.755, 40.707, 40.641], n),
+            'pickup_longitude': rng.choice([-73.985, -74.011], n),
+            'dropoff_latitude': rng.choice([40.755, 40.707], n),
+            'dropoff_longitude': rng.choice([-73.985, -74.011, -73.778], n),
+            'pickup_week_hour': rng.integers(0, 4, n),
+            'distance_haversine': rng.uniform(1, 20, n),
+            'trip_duration': rng.lognormal(6.5, 0.6, n).round(),
+        })
+        self.grid = ZoneGrid(0.01)
+
+    def test_chunks_match_build(self):
+        exact = ZonePairStats.build(self.frame, self.grid, min_trips=5)
+        accumulator = ZoneStatsAccumulator(self.grid)
+        for start in range(0, len(self.frame), 1000):
+            accumulator.add(self.frame.iloc[start:start + 1000])
+        chunked = accumulator.finish(min_trips=5)
+
+        np.testing.assert_array_equal(chunked.keys, exact.keys)
+        np.testing.assert_array_equal(chunked.values['trips'], exact.values['trips'])
+        np.testing.assert_allclose(chunked.values['avg_speed_kmh'], exact.values['avg_speed_kmh'], rtol=1e-6)
+        # Every slot here has well over twenty trips, so within one bin
+        np.testing.assert_allclose(chunked.values['median_duration'], exact.values['median_duration'], rtol=0.06)
+        self.assertEqual(chunked.fallback['trips'], exact.fallback['trips'])
+        self.assertAlmostEqual(chunked.fallback['median_duration'], exact.fallback['median_duration'],
+                               delta=0.06 * exact.fallback['median_duration'])
+
+    def test_no_chunks_gives_empty_stats(self):
+        stats = ZoneStatsAccumulator(self.grid).finish()
+        self.assertEqual(len(stats.keys), 0)
+        self.assertEqual(stats.lookup_one(0, 0, 8)['level'], 'global')
+
+
+if __name__ == '__main__':
+    unittest.main()